@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+import json
+
+from app.config import get_settings
+from app.db import DOCUMENT_MODELS, create_motor_client, init_database
+from app.services import assignments, migrations, rollup
+
+
+async def create_indexes() -> dict:
+    # init_beanie in run() has already built the indexes; this command exists to do only that.
+    return {"models": [model.get_collection_name() for model in DOCUMENT_MODELS]}
+
+
+COMMANDS = {
+    "create-indexes": create_indexes,
+    "migrate": migrations.run_all,
+    "rebuild-rollups": rollup.rebuild_rollups,
+    "backfill-period-summaries": migrations.backfill_period_summaries,
+    "dedupe-reports": migrations.dedupe_reports,
+    "backfill-period-assignments": migrations.backfill_period_assignments,
+    "rebuild-period-assignments": assignments.rebuild_assignments,
+}
+
+# Commands that must run before the declared indexes can be built.
+SKIP_INDEXES = {"dedupe-reports"}
+
+
+async def run(command: str) -> None:
+    settings = get_settings()
+    motor_client = create_motor_client(settings)
+    try:
+        await init_database(motor_client, settings, skip_indexes=command in SKIP_INDEXES)
+        result = await COMMANDS[command]()
+        print(json.dumps(result, default=str))
+    finally:
+        motor_client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Teacher AMS maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(run(args.command))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,68 @@
 from functools import lru_cache
-from pydantic import Field
+from typing import List, Literal
+
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+ReadPreferenceName = Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+
 
 class Settings(BaseSettings):
     mongodb_uri: str = Field("mongodb://localhost:27017", alias="MONGODB_URI")
     mongodb_db: str = Field("teacher_ams", alias="MONGODB_DB")
     mongodb_tls_allow_invalid_cert: bool = Field(False, alias="MONGODB_TLS_ALLOW_INVALID_CERT")
     mongodb_tls_ca_file: str | None = Field(None, alias="MONGODB_TLS_CA_FILE")
+    mongodb_max_pool_size: int = Field(100, alias="MONGODB_MAX_POOL_SIZE")
+    mongodb_min_pool_size: int = Field(0, alias="MONGODB_MIN_POOL_SIZE")
+    mongodb_max_idle_time_ms: int | None = Field(None, alias="MONGODB_MAX_IDLE_TIME_MS")
+    mongodb_server_selection_timeout_ms: int = Field(30_000, alias="MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+    mongodb_compressors: List[Literal["zstd", "snappy", "zlib"]] = Field([], alias="MONGODB_COMPRESSORS")
+    mongodb_analytics_read_preference: ReadPreferenceName = Field(
+        "primary", alias="MONGODB_ANALYTICS_READ_PREFERENCE"
+    )
+    health_ping_timeout_seconds: float = Field(2.0, alias="HEALTH_PING_TIMEOUT_SECONDS")
+    skip_index_creation: bool = Field(False, alias="SKIP_INDEX_CREATION")
+    server_host: str = Field("127.0.0.1", alias="HOST")
+    server_port: int = Field(8000, alias="PORT")
+    server_workers: int = Field(1, alias="WEB_CONCURRENCY")
     jwt_secret: str = Field("change-me", alias="JWT_SECRET")
     jwt_algorithm: str = Field("HS256", alias="JWT_ALGORITHM")
     access_token_expire_minutes: int = Field(60, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    password_hash_executor: Literal["thread", "process"] = Field("thread", alias="PASSWORD_HASH_EXECUTOR")
+    password_hash_workers: int = Field(4, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_concurrency: int = Field(16, alias="PASSWORD_HASH_MAX_CONCURRENCY")
+    password_hash_rounds: int = Field(600_000, ge=29_000, alias="PASSWORD_HASH_ROUNDS")
+    display_id_block_size: int = Field(50, alias="DISPLAY_ID_BLOCK_SIZE")
+    slow_request_ms: float = Field(500, alias="SLOW_REQUEST_MS")
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    analytics_use_rollups: bool = Field(True, alias="ANALYTICS_USE_ROLLUPS")
+    analytics_job_workers: int = Field(2, alias="ANALYTICS_JOB_WORKERS")
+    analytics_job_queue_size: int = Field(100, alias="ANALYTICS_JOB_QUEUE_SIZE")
+    analytics_job_ttl_seconds: float = Field(3600, alias="ANALYTICS_JOB_TTL_SECONDS")
+    report_events_source: Literal["local", "change_stream"] = Field("local", alias="REPORT_EVENTS_SOURCE")
+    report_stream_buffer_size: int = Field(100, alias="REPORT_STREAM_BUFFER_SIZE")
+    report_stream_max_subscribers: int = Field(500, alias="REPORT_STREAM_MAX_SUBSCRIBERS")
+    report_stream_keepalive_seconds: float = Field(15, alias="REPORT_STREAM_KEEPALIVE_SECONDS")
+    term_start_months: List[int] = Field([1, 5, 9], alias="TERM_START_MONTHS")
+    user_cache_ttl_seconds: float = Field(60, alias="USER_CACHE_TTL_SECONDS")
+    user_cache_max_size: int = Field(10_000, alias="USER_CACHE_MAX_SIZE")
+    token_cache_ttl_seconds: float = Field(300, alias="TOKEN_CACHE_TTL_SECONDS")
+    token_cache_max_size: int = Field(10_000, alias="TOKEN_CACHE_MAX_SIZE")
+    token_revocation_refresh_seconds: float = Field(30, alias="TOKEN_REVOCATION_REFRESH_SECONDS")
+    response_cache_ttl_seconds: float = Field(300, alias="RESPONSE_CACHE_TTL_SECONDS")
+    response_cache_max_size: int = Field(1_000, alias="RESPONSE_CACHE_MAX_SIZE")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
+    @field_validator("term_start_months")
+    @classmethod
+    def validate_term_start_months(cls, months: List[int]) -> List[int]:
+        if not months:
+            raise ValueError("TERM_START_MONTHS must list at least one month")
+        if any(month < 1 or month > 12 for month in months):
+            raise ValueError("TERM_START_MONTHS values must be months between 1 and 12")
+        return months
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,45 @@
+from typing import Optional
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import Settings
+from app.models.assignment import PeriodAssignment
+from app.models.counter import Counter
+from app.models.job import AnalyticsJob
+from app.models.report import DailyReport
+from app.models.rollup import ClassDayRollup, TeacherDayRollup
+from app.models.user import User
+from app.services.database import client_options
+from app.services.metrics import CommandTimer, pool_monitor
+
+DOCUMENT_MODELS = [
+    User,
+    DailyReport,
+    ClassDayRollup,
+    TeacherDayRollup,
+    PeriodAssignment,
+    Counter,
+    AnalyticsJob,
+]
+
+
+def create_motor_client(settings: Settings) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        settings.mongodb_uri,
+        event_listeners=[CommandTimer(), pool_monitor],
+        **client_options(settings),
+    )
+
+
+async def init_database(
+    motor_client: AsyncIOMotorClient, settings: Settings, skip_indexes: Optional[bool] = None
+) -> None:
+    """Initialise Beanie; index creation is skipped when ``skip_indexes`` (default: the setting) is true."""
+    if skip_indexes is None:
+        skip_indexes = settings.skip_index_creation
+    await init_beanie(
+        database=motor_client[settings.mongodb_db],
+        document_models=DOCUMENT_MODELS,
+        skip_indexes=skip_indexes,
+    )
@@ -1,37 +1,128 @@
+import hashlib
+import time
+
 from beanie import PydanticObjectId
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 
 from app.config import Settings, get_settings
 from app.models.user import Role, User
-from app.schemas.auth import TokenPayload
-from app.services.auth import decode_token
+from app.schemas.auth import TokenPayload, TokenPrincipal
+from app.services.auth import TokenRevocations, decode_token, get_token_revocations
+from app.services.cache import TTLCache, get_token_cache, get_user_cache
+from app.services.metrics import phase
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), settings: Settings = Depends(get_settings)
-) -> User:
-    credentials_exception = HTTPException(
+def _decode_cached(token: str, settings: Settings, token_cache: TTLCache) -> TokenPayload:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        if token_data.exp is None or token_data.exp > time.time():
+            return token_data
+        token_cache.invalidate(key)
+    token_data = TokenPayload(**decode_token(token, settings))
+    # Never keep a decoded token around past its own expiry.
+    ttl = token_data.exp - time.time() if token_data.exp is not None else None
+    token_cache.set(key, token_data, ttl=ttl)
+    return token_data
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def _authenticate(
+    token: str, settings: Settings, token_cache: TTLCache, revocations: TokenRevocations
+) -> TokenPayload:
+    """Verify the token's signature, expiry and version; no user lookup."""
     try:
-        payload = decode_token(token, settings)
-        token_data = TokenPayload(**payload)
+        with phase("jwt"):
+            token_data = _decode_cached(token, settings, token_cache)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
     if token_data.sub is None:
-        raise credentials_exception
-    user = await User.get(PydanticObjectId(token_data.sub))
+        raise _credentials_exception()
+    if token_data.ver < await revocations.min_version(token_data.sub):
+        raise _credentials_exception()
+    return token_data
+
+
+async def _load_user(user_id: str, user_cache: TTLCache) -> User:
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        with phase("user"):
+            user = await User.get(PydanticObjectId(user_id))
+        if user is None:
+            raise _credentials_exception()
+        user_cache.set(user_id, user)
     return user
 
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    settings: Settings = Depends(get_settings),
+    user_cache: TTLCache = Depends(get_user_cache),
+    token_cache: TTLCache = Depends(get_token_cache),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> User:
+    token_data = await _authenticate(token, settings, token_cache, revocations)
+    user = await _load_user(token_data.sub, user_cache)
+    # Hand each request its own copy so handlers cannot mutate the cached instance.
+    return user.model_copy()
+
+
+async def _principal(
+    token: str, settings: Settings, user_cache: TTLCache, token_cache: TTLCache, revocations: TokenRevocations
+) -> TokenPrincipal:
+    token_data = await _authenticate(token, settings, token_cache, revocations)
+    if token_data.role is None:
+        # Tokens issued before role claims existed still work, at the cost of a user lookup.
+        user = await _load_user(token_data.sub, user_cache)
+        return TokenPrincipal(id=user.id, role=user.role, display_id=user.display_id)
+    return TokenPrincipal(id=PydanticObjectId(token_data.sub), role=token_data.role, display_id=token_data.display_id)
+
+
+async def get_token_principal(
+    token: str = Depends(oauth2_scheme),
+    settings: Settings = Depends(get_settings),
+    user_cache: TTLCache = Depends(get_user_cache),
+    token_cache: TTLCache = Depends(get_token_cache),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> TokenPrincipal:
+    """Authorize from the token's claims alone, for read endpoints that only need the caller's id and role.
+
+    A role change only reaches the claims when the user logs in again, so anything that changes a user's
+    role must also revoke their tokens.
+    """
+    return await _principal(token, settings, user_cache, token_cache, revocations)
+
+
+async def get_stream_principal(
+    header_token: str | None = Depends(optional_oauth2_scheme),
+    access_token: str | None = Query(None),
+    settings: Settings = Depends(get_settings),
+    user_cache: TTLCache = Depends(get_user_cache),
+    token_cache: TTLCache = Depends(get_token_cache),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> TokenPrincipal:
+    """Like ``get_token_principal``, but also accepts ``?access_token=``, since EventSource cannot send headers.
+
+    Query-string tokens can end up in proxy logs, so only the stream endpoint accepts them.
+    """
+    token = header_token or access_token
+    if token is None:
+        raise _credentials_exception()
+    return await _principal(token, settings, user_cache, token_cache, revocations)
+
+
 def require_roles(*roles: Role):
     async def role_checker(current_user: User = Depends(get_current_user)) -> User:
         if current_user.role not in roles:
@@ -39,3 +130,12 @@ def require_roles(*roles: Role):
         return current_user
 
     return role_checker
+
+
+def require_principal_roles(*roles: Role):
+    async def role_checker(principal: TokenPrincipal = Depends(get_token_principal)) -> TokenPrincipal:
+        if principal.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+        return principal
+
+    return role_checker
@@ -1,16 +1,21 @@
+import logging
 from contextlib import asynccontextmanager
 from typing import Optional
 
-from beanie import init_beanie
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
-import certifi
 
 from app.config import Settings, get_settings
-from app.models.report import DailyReport
-from app.models.user import User
-from app.routers import analytics, auth, reports
+from app.db import DOCUMENT_MODELS, create_motor_client, init_database  # noqa: F401 - re-exported
+from app.middleware import TimingMiddleware
+from app.routers import analytics, auth, diagnostics, health, metrics, reports, teachers
+from app.services.auth import get_password_hasher
+from app.services.events import get_report_broker
+from app.services.jobs import get_job_queue
+from app.services.metrics import startup
+
+logger = logging.getLogger("app.startup")
 
 
 @asynccontextmanager
@@ -19,15 +24,28 @@ async def lifespan(app: FastAPI):
     motor_client = app.state.motor_client
     created_client = False
     if motor_client is None:
-        motor_client = AsyncIOMotorClient(
-            settings.mongodb_uri,
-            tlsCAFile=settings.mongodb_tls_ca_file or certifi.where(),
-            tlsAllowInvalidCertificates=settings.mongodb_tls_allow_invalid_cert,
-        )
+        with startup.phase("connect"):
+            motor_client = create_motor_client(settings)
         created_client = True
-    db = motor_client[settings.mongodb_db]
-    await init_beanie(database=db, document_models=[User, DailyReport])
+    with startup.phase("init_beanie"):
+        await init_database(motor_client, settings)
+    # Workers never migrate: the backfills scan whole collections, which every worker of a deploy would repeat.
+    # ``python -m app.server`` runs them once in the leader; other deploys run ``python -m app.cli migrate``.
+    logger.info(
+        "worker ready (indexes %s): %s",
+        "skipped" if settings.skip_index_creation else "ensured",
+        startup.summary(),
+    )
     yield
+    if get_report_broker.cache_info().currsize:
+        await get_report_broker().shutdown()
+        get_report_broker.cache_clear()
+    if get_job_queue.cache_info().currsize:
+        await get_job_queue().shutdown()
+        get_job_queue.cache_clear()
+    if get_password_hasher.cache_info().currsize:
+        get_password_hasher().shutdown()
+        get_password_hasher.cache_clear()
     if created_client:
         motor_client.close()
 
@@ -44,12 +62,26 @@ def create_app(settings: Optional[Settings] = None, motor_client: Optional[Async
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "Server-Timing"],
     )
+    app.add_middleware(TimingMiddleware, slow_request_ms=settings.slow_request_ms)
 
     app.include_router(auth.router)
     app.include_router(reports.router)
     app.include_router(analytics.router)
+    app.include_router(teachers.router)
+    app.include_router(diagnostics.router)
+    app.include_router(health.router)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # ``uvicorn app.main:app`` still works, but importing this module (tests, tools) no longer builds an app.
+    if name == "app":
+        global app
+        with startup.phase("create_app"):
+            app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
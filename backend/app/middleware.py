@@ -0,0 +1,55 @@
+import logging
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.services.metrics import RequestStats, current_request, registry
+
+logger = logging.getLogger("app.requests")
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stats.phases.items()]
+    entries.append(f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.db_commands} queries, {stats.db_documents} docs"')
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    """Times each request, counts its Mongo round-trips and reports both via Server-Timing and /metrics."""
+
+    def __init__(self, app, slow_request_ms: float) -> None:
+        super().__init__(app)
+        self.slow_request_ms = slow_request_ms
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            current_request.reset(token)
+        total = time.perf_counter() - started
+
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        registry.inc("http_requests_total", method=request.method, route=path, status=str(response.status_code))
+        registry.observe("http_request_duration_seconds", total, method=request.method, route=path)
+        response.headers["Server-Timing"] = server_timing(stats, total)
+
+        if total * 1000 >= self.slow_request_ms:
+            logger.warning(
+                "slow request %s %s status=%s total_ms=%.1f db_ms=%.1f db_commands=%d db_documents=%d phases=%s",
+                request.method,
+                request.url.path,
+                response.status_code,
+                total * 1000,
+                stats.db_seconds * 1000,
+                stats.db_commands,
+                stats.db_documents,
+                {name: round(seconds * 1000, 1) for name, seconds in stats.phases.items()},
+            )
+        return response
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+
+
+class PeriodAssignment(Document):
+    """One period of one report, keyed by the subject teacher who was assigned to it."""
+
+    subject_teacher_id: PydanticObjectId
+    date: date
+    class_name: str
+    period_number: int
+    subject: str
+    signed: bool
+    report_id: PydanticObjectId
+    # When a report write or rebuild last wrote the row; a rebuild deletes the rows it finds older than itself.
+    written_at: Optional[datetime] = None
+
+    class Settings:
+        name = "period_assignments"
+        use_revision = False
+        indexes = [
+            # Serves /teachers/{id}/periods in sort order, and keeps the backfill idempotent.
+            IndexModel(
+                [
+                    ("subject_teacher_id", ASCENDING),
+                    ("date", ASCENDING),
+                    ("class_name", ASCENDING),
+                    ("period_number", ASCENDING),
+                ],
+                unique=True,
+            ),
+            # Covers the /teachers/{id}/workload aggregation, so it never fetches documents; /diagnostics/query-plans
+            # checks that the plan stays covered.
+            IndexModel([("subject_teacher_id", ASCENDING), ("date", ASCENDING), ("signed", ASCENDING)]),
+            IndexModel([("report_id", ASCENDING)]),
+        ]
@@ -0,0 +1,12 @@
+from beanie import Document
+
+
+class Counter(Document):
+    """A named monotonically increasing integer, e.g. a collection version or an id sequence."""
+
+    id: str  # type: ignore[assignment]
+    value: int = 0
+
+    class Settings:
+        name = "counters"
+        use_revision = False
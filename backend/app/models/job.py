@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+JobKind = Literal["workload", "missed-periods", "daily-summary"]
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class AnalyticsJob(Document):
+    """A queued analytics computation and, once finished, its result rows."""
+
+    kind: JobKind
+    engine: Literal["database", "numpy"] = "database"
+    filters: Dict[str, Any] = {}
+    owner_id: PydanticObjectId
+    status: JobStatus = "queued"
+    result: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Set when the job finishes, so a job waiting in a busy queue cannot expire before it runs.
+    expires_at: Optional[datetime] = None
+
+    class Settings:
+        name = "analytics_jobs"
+        use_revision = False
+        indexes = [
+            # Finished jobs are removed by MongoDB's TTL monitor; documents without expires_at are kept.
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -1,8 +1,12 @@
 from datetime import date, datetime
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from beanie import Document, Indexed, PydanticObjectId
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+from pymongo import ASCENDING, IndexModel
+
+PERIODS_PER_DAY = 8
+ALL_PERIODS_MASK = (1 << PERIODS_PER_DAY) - 1
 
 
 class PeriodEntry(BaseModel):
@@ -21,21 +25,66 @@ class PeriodEntry(BaseModel):
         return v
 
 
+class TeacherSlots(BaseModel):
+    """One subject teacher's share of a report; bit ``n - 1`` of a mask stands for period ``n``."""
+
+    subject_teacher_id: PydanticObjectId
+    slots: int
+    signed: int
+    periods: int
+    taught: int
+
+
+def summarize_periods(periods: Iterable[PeriodEntry]) -> Tuple[int, List[TeacherSlots]]:
+    """Return the report's signed-period mask and its per-teacher slot summaries."""
+    signed_mask = 0
+    by_teacher: Dict[PydanticObjectId, TeacherSlots] = {}
+    for period in periods:
+        bit = 1 << (period.period_number - 1)
+        summary = by_teacher.get(period.subject_teacher_id)
+        if summary is None:
+            summary = by_teacher[period.subject_teacher_id] = TeacherSlots(
+                subject_teacher_id=period.subject_teacher_id, slots=0, signed=0, periods=0, taught=0
+            )
+        summary.slots |= bit
+        summary.periods += 1
+        if period.signed:
+            signed_mask |= bit
+            summary.signed |= bit
+            summary.taught += 1
+    return signed_mask, list(by_teacher.values())
+
+
 class DailyReport(Document):
     date: Indexed(date)  # type: ignore[assignment]
     class_name: str = Field(min_length=1)
     class_teacher_id: PydanticObjectId
     periods: List[PeriodEntry] = Field(min_length=8, max_length=8)
     total_periods_taught: int = 0
+    # Denormalized from periods so coverage queries can use bitwise operators and skip the array.
+    signed_mask: int = 0
+    teacher_slots: List[TeacherSlots] = []
+    idempotency_key: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "daily_reports"
         use_revision = False
+        # One index per query shape produced by build_query; each ends in date so date ranges
+        # and the (date, _id) page order stay index-bounded.
         indexes = [
-            "date",
-            "class_name",
-            "class_teacher_id",
+            IndexModel([("date", ASCENDING), ("_id", ASCENDING)]),
+            # Unique: a class files at most one report per day, which makes submission idempotent.
+            IndexModel([("class_name", ASCENDING), ("date", ASCENDING)], unique=True),
+            IndexModel([("class_teacher_id", ASCENDING), ("date", ASCENDING)]),
+            IndexModel([("periods.subject_teacher_id", ASCENDING), ("date", ASCENDING)]),
+            # signed_mask leads: the planner only uses an index with a predicate on its first field, so
+            # (date, signed_mask) could not serve the coverage filters on their own.
+            IndexModel([("signed_mask", ASCENDING), ("date", ASCENDING)]),
+            # Finds the report an Idempotency-Key was first used for; reports sent without one are left out.
+            IndexModel(
+                [("idempotency_key", ASCENDING)], partialFilterExpression={"idempotency_key": {"$type": "string"}}
+            ),
         ]
 
     @field_validator("periods")
@@ -46,6 +95,11 @@ class DailyReport(Document):
             raise ValueError("periods must include exactly one entry for period numbers 1-8")
         return periods
 
+    @model_validator(mode="after")
+    def derive_period_summaries(self) -> "DailyReport":
+        self.signed_mask, self.teacher_slots = summarize_periods(self.periods)
+        return self
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -0,0 +1,55 @@
+from datetime import date, datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+
+
+class ClassDayRollup(Document):
+    class_name: str
+    class_teacher_id: PydanticObjectId
+    date: date
+    reports: int = 0
+    signed: int = 0
+    missed: int = 0
+    # A class files one report a day, so a row stands for at most one report.
+    report_id: Optional[PydanticObjectId] = None
+    # When a report write or rebuild last wrote the row; a rebuild deletes the rows it finds older than itself.
+    written_at: Optional[datetime] = None
+
+    class Settings:
+        name = "class_day_rollups"
+        use_revision = False
+        indexes = [
+            IndexModel(
+                [("class_name", ASCENDING), ("class_teacher_id", ASCENDING), ("date", ASCENDING)],
+                unique=True,
+            ),
+            "date",
+        ]
+
+
+class TeacherDayRollup(Document):
+    subject_teacher_id: PydanticObjectId
+    class_name: str
+    class_teacher_id: PydanticObjectId
+    date: date
+    signed: int = 0
+    missed: int = 0
+    written_at: Optional[datetime] = None
+
+    class Settings:
+        name = "teacher_day_rollups"
+        use_revision = False
+        indexes = [
+            IndexModel(
+                [
+                    ("subject_teacher_id", ASCENDING),
+                    ("class_name", ASCENDING),
+                    ("class_teacher_id", ASCENDING),
+                    ("date", ASCENDING),
+                ],
+                unique=True,
+            ),
+            "date",
+        ]
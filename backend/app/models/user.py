@@ -4,6 +4,7 @@ from typing import Optional
 from beanie import Document
 from beanie import Indexed
 from pydantic import EmailStr, Field
+from pymongo import ASCENDING, IndexModel
 
 
 class Role(str, Enum):
@@ -17,10 +18,20 @@ class User(Document):
     hashed_password: str
     role: Role = Role.teacher
     display_id: Optional[str] = Field(default=None, min_length=4)
+    # Bumped to revoke every token issued so far; tokens carry the version they were issued with.
+    token_version: int = 0
 
     class Settings:
         name = "users"
         use_revision = False
+        indexes = [
+            # Partial rather than sparse: Beanie stores a missing display_id as null, which sparse would index.
+            IndexModel(
+                [("display_id", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"display_id": {"$type": "string"}},
+            ),
+        ]
 
     class Config:
         json_schema_extra = {
@@ -1,46 +1,67 @@
 from datetime import date
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 
-from app.deps import get_current_user
-from app.models.user import User
-from app.schemas.analytics import DailySummaryResponse, MissedPeriodsResponse, WorkloadResponse
+from app.deps import get_token_principal
+from app.schemas.auth import TokenPrincipal
+from app.schemas.analytics import (
+    AnalyticsJobCreate,
+    AnalyticsJobOut,
+    CoverageStats,
+    DailySummaryResponse,
+    MissedPeriodsResponse,
+    TimeseriesResponse,
+    WorkloadResponse,
+)
 from app.schemas.report import DailyReportFilter
 from app.services import analytics
+from app.services.jobs import get_job, get_job_queue, job_out
+from app.services.response_cache import cached_json
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
 @router.get("/missed-periods", response_model=MissedPeriodsResponse)
 async def missed_periods(
+    request: Request,
+    engine: analytics.Engine = "database",
     class_name: str | None = None,
     class_teacher_id: str | None = None,
     subject_teacher_id: str | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    current_user: User = Depends(get_current_user),
-) -> MissedPeriodsResponse:
+    missed_period: int | None = Query(None, ge=1, le=8),
+    fully_signed: bool | None = None,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
     filters = DailyReportFilter(
         class_name=class_name,
         class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
         subject_teacher_id=PydanticObjectId(subject_teacher_id) if subject_teacher_id else None,
         start_date=start_date,
         end_date=end_date,
+        missed_period=missed_period,
+        fully_signed=fully_signed,
     )
-    items = await analytics.missed_periods(filters)
-    return MissedPeriodsResponse(items=items)
+
+    async def compute() -> MissedPeriodsResponse:
+        return MissedPeriodsResponse(items=await analytics.missed_periods(filters, engine))
+
+    return await cached_json(request, current_user, (filters.model_dump_json(), engine), compute)
 
 
 @router.get("/workload", response_model=WorkloadResponse)
 async def workload(
+    request: Request,
+    engine: analytics.Engine = "database",
     class_name: str | None = None,
     class_teacher_id: str | None = None,
     subject_teacher_id: str | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    current_user: User = Depends(get_current_user),
-) -> WorkloadResponse:
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
     filters = DailyReportFilter(
         class_name=class_name,
         class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
@@ -48,19 +69,75 @@ async def workload(
         start_date=start_date,
         end_date=end_date,
     )
-    items = await analytics.workload(filters)
-    return WorkloadResponse(items=items)
+
+    async def compute() -> WorkloadResponse:
+        return WorkloadResponse(items=await analytics.workload(filters, engine))
+
+    return await cached_json(request, current_user, (filters.model_dump_json(), engine), compute)
 
 
 @router.get("/daily-summary", response_model=DailySummaryResponse)
 async def daily_summary(
+    request: Request,
+    engine: analytics.Engine = "database",
+    class_name: str | None = None,
+    class_teacher_id: str | None = None,
+    subject_teacher_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
+    filters = DailyReportFilter(
+        class_name=class_name,
+        class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
+        subject_teacher_id=PydanticObjectId(subject_teacher_id) if subject_teacher_id else None,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    async def compute() -> DailySummaryResponse:
+        return DailySummaryResponse(items=await analytics.daily_summary(filters, engine))
+
+    return await cached_json(request, current_user, (filters.model_dump_json(), engine), compute)
+
+
+@router.get("/timeseries", response_model=TimeseriesResponse)
+async def timeseries(
+    request: Request,
+    bucket: analytics.Bucket = "week",
+    group_by: analytics.GroupBy = "class",
+    class_name: str | None = None,
+    class_teacher_id: str | None = None,
+    subject_teacher_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
+    filters = DailyReportFilter(
+        class_name=class_name,
+        class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
+        subject_teacher_id=PydanticObjectId(subject_teacher_id) if subject_teacher_id else None,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    async def compute() -> TimeseriesResponse:
+        items, truncated = await analytics.timeseries(filters, bucket, group_by)
+        return TimeseriesResponse(bucket=bucket, group_by=group_by, items=items, truncated=truncated)
+
+    return await cached_json(request, current_user, (filters.model_dump_json(), bucket, group_by), compute)
+
+
+@router.get("/coverage-stats", response_model=CoverageStats)
+async def coverage_stats(
+    request: Request,
     class_name: str | None = None,
     class_teacher_id: str | None = None,
     subject_teacher_id: str | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    current_user: User = Depends(get_current_user),
-) -> DailySummaryResponse:
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
     filters = DailyReportFilter(
         class_name=class_name,
         class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
@@ -68,5 +145,24 @@ async def daily_summary(
         start_date=start_date,
         end_date=end_date,
     )
-    items = await analytics.daily_summary(filters)
-    return DailySummaryResponse(items=items)
+
+    async def compute() -> CoverageStats:
+        return await analytics.coverage_stats(filters)
+
+    return await cached_json(request, current_user, (filters.model_dump_json(),), compute)
+
+
+@router.post("/jobs", response_model=AnalyticsJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    payload: AnalyticsJobCreate,
+    response: Response,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> AnalyticsJobOut:
+    job = await get_job_queue().submit(payload, current_user)
+    response.headers["Location"] = f"/analytics/jobs/{job.id}"
+    return job_out(job)
+
+
+@router.get("/jobs/{job_id}", response_model=AnalyticsJobOut)
+async def read_job(job_id: str, current_user: TokenPrincipal = Depends(get_token_principal)) -> AnalyticsJobOut:
+    return job_out(await get_job(job_id, current_user))
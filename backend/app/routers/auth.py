@@ -1,46 +1,67 @@
 from datetime import timedelta
-import uuid
+from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Response, UploadFile, status
 
 from app.config import Settings, get_settings
-from app.deps import get_current_user
+from app.deps import get_current_user, require_roles
 from app.models.user import Role, User
-from app.schemas.auth import LoginRequest, SignupRequest, Token, UserPublic
-from app.services.auth import create_access_token, get_password_hash, verify_password
+from app.schemas.auth import BulkUserResponse, LoginRequest, SignupRequest, Token, UserPublic
+from app.services.auth import (
+    PasswordHasher,
+    TokenRevocations,
+    create_access_token,
+    get_password_hasher,
+    get_token_revocations,
+    user_claims,
+)
+from app.services.cache import invalidate_user
+from app.services.users import allocate_display_ids, create_users_bulk, parse_users_csv
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-
-async def generate_display_id(prefix: str = "T", attempts: int = 5) -> str:
-    """Generate a short, human-friendly ID and ensure it is not already used."""
-    for _ in range(attempts):
-        candidate = f"{prefix}-{uuid.uuid4().hex[:6].upper()}"
-        existing = await User.find_one({"display_id": candidate})
-        if not existing:
-            return candidate
-    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not allocate display id")
+MAX_BULK_USERS = 1000
 
 
 @router.post("/login", response_model=Token)
-async def login(data: LoginRequest, settings: Settings = Depends(get_settings)) -> Token:
+async def login(
+    data: LoginRequest,
+    settings: Settings = Depends(get_settings),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+) -> Token:
     user = await User.find_one({"email": data.email})
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await hasher.verify_and_update(data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    token, expires = create_access_token(str(user.id), settings, timedelta(minutes=settings.access_token_expire_minutes))
+    if new_hash:
+        await user.set({User.hashed_password: new_hash})
+        invalidate_user(user.id)
+    token, expires = create_access_token(
+        str(user.id),
+        settings,
+        timedelta(minutes=settings.access_token_expire_minutes),
+        claims=user_claims(user),
+    )
     return Token(access_token=token, expires_at=expires)
 
 
 @router.post("/signup", response_model=UserPublic)
-async def signup(data: SignupRequest, settings: Settings = Depends(get_settings)) -> UserPublic:
+async def signup(
+    data: SignupRequest,
+    settings: Settings = Depends(get_settings),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+) -> UserPublic:
     existing = await User.find_one({"email": data.email})
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
-    display_id = await generate_display_id()
+    [display_id] = await allocate_display_ids()
     user = User(
         name=data.name,
         email=data.email,
-        hashed_password=get_password_hash(data.password),
+        hashed_password=await hasher.hash(data.password),
         role=Role.teacher,
         display_id=display_id,
     )
@@ -57,3 +78,51 @@ async def me(current_user: User = Depends(get_current_user)) -> UserPublic:
         role=current_user.role,
         display_id=current_user.display_id,
     )
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    current_user: User = Depends(get_current_user),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> Response:
+    await revocations.revoke(current_user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/users/{user_id}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_tokens(
+    user_id: PydanticObjectId,
+    current_user: User = Depends(require_roles(Role.admin)),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> Response:
+    await revocations.revoke(user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _import_users(items: List[Dict[str, Any]], hasher: PasswordHasher) -> BulkUserResponse:
+    if len(items) > MAX_BULK_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_USERS} users can be imported at once",
+        )
+    results = await create_users_bulk(items, hasher)
+    created = sum(1 for r in results if r.ok)
+    return BulkUserResponse(created=created, failed=len(results) - created, items=results)
+
+
+@router.post("/users/bulk", response_model=BulkUserResponse)
+async def import_users(
+    payload: List[Dict[str, Any]] = Body(...),
+    current_user: User = Depends(require_roles(Role.admin)),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+) -> BulkUserResponse:
+    return await _import_users(payload, hasher)
+
+
+@router.post("/users/bulk/csv", response_model=BulkUserResponse)
+async def import_users_csv(
+    file: UploadFile = File(...),
+    current_user: User = Depends(require_roles(Role.admin)),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+) -> BulkUserResponse:
+    return await _import_users(parse_users_csv(await file.read()), hasher)
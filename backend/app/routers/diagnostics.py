@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from app.deps import require_principal_roles
+from app.models.user import Role
+from app.schemas.auth import TokenPrincipal
+from app.schemas.diagnostics import QueryPlanReport
+from app.services.diagnostics import explain_report_queries
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/query-plans", response_model=QueryPlanReport)
+async def query_plans(current_user: TokenPrincipal = Depends(require_principal_roles(Role.admin))) -> QueryPlanReport:
+    return await explain_report_queries()
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response, status
+
+from app.schemas.health import HealthStatus
+from app.services.health import check_health
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health", response_model=HealthStatus)
+async def health(response: Response) -> HealthStatus:
+    result = await check_health()
+    if result.status != "ok":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
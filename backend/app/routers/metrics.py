@@ -0,0 +1,61 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.analytics import singleflight
+from app.services.auth import get_password_hasher
+from app.services.cache import get_response_cache, get_token_cache, get_user_cache
+from app.services.events import get_report_broker
+from app.services.jobs import get_job_queue
+from app.services.metrics import pool_monitor, registry, startup
+
+router = APIRouter(tags=["metrics"])
+
+
+def _cache_stats():
+    values = {}
+    for name, cache in (("user", get_user_cache()), ("token", get_token_cache()), ("response", get_response_cache())):
+        for stat, value in cache.stats().items():
+            values[(("cache", name), ("stat", stat))] = value
+    return values
+
+
+def _hasher_stats():
+    return {(("stat", stat),): value for stat, value in get_password_hasher().stats().items()}
+
+
+def _job_stats():
+    return {(("stat", stat),): value for stat, value in get_job_queue().stats().items()}
+
+
+def _stream_stats():
+    return {(("stat", stat),): value for stat, value in get_report_broker().stats().items()}
+
+
+def _pool_stats():
+    values = {}
+    for address, stats in pool_monitor.snapshot().items():
+        values[(("server", address), ("state", "open"))] = stats.open
+        values[(("server", address), ("state", "checked_out"))] = stats.checked_out
+    return values
+
+
+registry.gauge("app_cache", _cache_stats, "In-process cache sizes and hit/miss/eviction counts.")
+registry.gauge("password_hasher", _hasher_stats, "Password hashing pool queue depth and throughput.")
+registry.gauge("analytics_jobs", _job_stats, "Background analytics job queue depth and outcomes.")
+registry.gauge(
+    "analytics_singleflight_in_flight",
+    lambda: {(): singleflight.in_flight()},
+    "Distinct analytics computations currently in flight.",
+)
+registry.gauge("report_stream", _stream_stats, "Report stream subscribers and buffered events.")
+registry.gauge(
+    "app_startup_seconds",
+    lambda: {(("phase", name),): seconds for name, seconds in startup.phases.items()},
+    "Time this process spent in each startup phase.",
+)
+registry.gauge("mongo_pool_connections", _pool_stats, "Open and checked-out MongoDB connections per server.")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,19 +1,52 @@
 from datetime import date
+from typing import Any, Dict, List
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
-from app.deps import get_current_user
+from app.config import Settings, get_settings
+from app.deps import get_current_user, get_stream_principal, get_token_principal
 from app.models.user import User
-from app.schemas.report import DailyReportCreate, DailyReportFilter, DailyReportOut
-from app.services.report import create_report, get_report, list_reports
+from app.schemas.auth import TokenPrincipal
+from app.schemas.report import (
+    BulkReportResponse,
+    DailyReportCreate,
+    DailyReportFilter,
+    DailyReportOut,
+    DailyReportPage,
+)
+from app.services.events import get_report_broker, stream_frames
+from app.services.response_cache import cached_json
+from app.services.report import (
+    ExportFormat,
+    ExportRows,
+    create_report,
+    create_reports_bulk,
+    encode_report_page,
+    export_reports,
+    get_report,
+    list_reports_page,
+    parse_fields,
+)
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_REPORTS = 500
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 
 @router.post("", response_model=DailyReportOut)
-async def submit_report(payload: DailyReportCreate, current_user: User = Depends(get_current_user)) -> DailyReportOut:
-    report = await create_report(payload, current_user)
+async def submit_report(
+    payload: DailyReportCreate,
+    idempotency_key: str | None = Header(None, max_length=255),
+    current_user: User = Depends(get_current_user),
+) -> DailyReportOut:
+    report = await create_report(payload, current_user, idempotency_key)
     return DailyReportOut(
         id=str(report.id),
         date=report.date,
@@ -25,46 +58,112 @@ async def submit_report(payload: DailyReportCreate, current_user: User = Depends
     )
 
 
-@router.get("/{report_id}", response_model=DailyReportOut)
-async def fetch_report(report_id: str, current_user: User = Depends(get_current_user)) -> DailyReportOut:
-    report = await get_report(report_id)
-    return DailyReportOut(
-        id=str(report.id),
-        date=report.date,
-        class_name=report.class_name,
-        class_teacher_id=report.class_teacher_id,
-        periods=[p.model_dump() for p in report.periods],
-        total_periods_taught=report.total_periods_taught,
-        created_at=report.created_at,
+@router.post("/bulk", response_model=BulkReportResponse)
+async def submit_reports_bulk(
+    payload: List[Dict[str, Any]] = Body(...),
+    current_user: User = Depends(get_current_user),
+) -> BulkReportResponse:
+    if len(payload) > MAX_BULK_REPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_REPORTS} reports can be submitted at once",
+        )
+    results = await create_reports_bulk(payload, current_user)
+    inserted = sum(1 for r in results if r.ok)
+    return BulkReportResponse(inserted=inserted, failed=len(results) - inserted, items=results)
+
+
+@router.get("/export")
+async def export(
+    class_name: str | None = None,
+    class_teacher_id: str | None = None,
+    subject_teacher_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    format: ExportFormat = "ndjson",
+    rows: ExportRows = "report",
+    batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> StreamingResponse:
+    filters = DailyReportFilter(
+        class_name=class_name,
+        class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
+        subject_teacher_id=PydanticObjectId(subject_teacher_id) if subject_teacher_id else None,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    return StreamingResponse(
+        export_reports(filters, format, rows, batch_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="reports-{rows}.{format}"'},
+    )
+
+
+@router.get("/stream")
+async def stream_reports(
+    request: Request,
+    class_name: str | None = None,
+    current_user: TokenPrincipal = Depends(get_stream_principal),
+    settings: Settings = Depends(get_settings),
+) -> StreamingResponse:
+    broker = get_report_broker()
+    if settings.report_events_source == "change_stream":
+        broker.start_change_stream()
+    # Refuse with 503 while that is still possible; stream_frames subscribes once streaming starts.
+    broker.check_capacity()
+    return StreamingResponse(
+        stream_frames(broker, class_name, request.is_disconnected, settings.report_stream_keepalive_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
-@router.get("", response_model=list[DailyReportOut])
+@router.get("/{report_id}", response_model=DailyReportOut)
+async def fetch_report(request: Request, report_id: str, current_user: TokenPrincipal = Depends(get_token_principal)) -> Response:
+    async def compute() -> DailyReportOut:
+        report = await get_report(report_id)
+        return DailyReportOut(
+            id=str(report.id),
+            date=report.date,
+            class_name=report.class_name,
+            class_teacher_id=report.class_teacher_id,
+            periods=[p.model_dump() for p in report.periods],
+            total_periods_taught=report.total_periods_taught,
+            created_at=report.created_at,
+        )
+
+    return await cached_json(request, current_user, (report_id,), compute)
+
+
+@router.get("", response_model=DailyReportPage, response_model_exclude_unset=True)
 async def fetch_reports(
+    request: Request,
     class_name: str | None = None,
     class_teacher_id: str | None = None,
     subject_teacher_id: str | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    current_user: User = Depends(get_current_user),
-) -> list[DailyReportOut]:
+    missed_period: int | None = Query(None, ge=1, le=8),
+    fully_signed: bool | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
     filters = DailyReportFilter(
         class_name=class_name,
         class_teacher_id=PydanticObjectId(class_teacher_id) if class_teacher_id else None,
         subject_teacher_id=PydanticObjectId(subject_teacher_id) if subject_teacher_id else None,
         start_date=start_date,
         end_date=end_date,
+        missed_period=missed_period,
+        fully_signed=fully_signed,
     )
-    reports = await list_reports(filters)
-    return [
-        DailyReportOut(
-            id=str(r.id),
-            date=r.date,
-            class_name=r.class_name,
-            class_teacher_id=r.class_teacher_id,
-            periods=[p.model_dump() for p in r.periods],
-            total_periods_taught=r.total_periods_taught,
-            created_at=r.created_at,
-        )
-        for r in reports
-    ]
+    requested = parse_fields(fields)
+
+    async def compute() -> bytes:
+        docs, next_cursor = await list_reports_page(filters, limit, cursor, requested)
+        return encode_report_page(docs, next_cursor, requested)
+
+    key = (filters.model_dump_json(), limit, cursor, tuple(requested or ()))
+    return await cached_json(request, current_user, key, compute)
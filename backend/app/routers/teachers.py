@@ -0,0 +1,46 @@
+from datetime import date
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from app.deps import get_token_principal
+from app.schemas.auth import TokenPrincipal
+from app.schemas.teacher import TeacherPeriodsResponse, TeacherWorkloadResponse
+from app.services.assignments import teacher_periods, teacher_workload
+from app.services.response_cache import cached_json
+
+router = APIRouter(prefix="/teachers", tags=["teachers"])
+
+DEFAULT_PERIODS_LIMIT = 500
+MAX_PERIODS_LIMIT = 5000
+
+
+@router.get("/{teacher_id}/periods", response_model=TeacherPeriodsResponse)
+async def periods(
+    request: Request,
+    teacher_id: PydanticObjectId,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    signed: bool | None = None,
+    limit: int = Query(DEFAULT_PERIODS_LIMIT, ge=1, le=MAX_PERIODS_LIMIT),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
+    async def compute() -> TeacherPeriodsResponse:
+        items, truncated = await teacher_periods(teacher_id, start_date, end_date, signed, limit)
+        return TeacherPeriodsResponse(teacher_id=str(teacher_id), items=items, truncated=truncated)
+
+    return await cached_json(request, current_user, (start_date, end_date, signed, limit), compute)
+
+
+@router.get("/{teacher_id}/workload", response_model=TeacherWorkloadResponse)
+async def workload(
+    request: Request,
+    teacher_id: PydanticObjectId,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+) -> Response:
+    async def compute() -> TeacherWorkloadResponse:
+        return await teacher_workload(teacher_id, start_date, end_date)
+
+    return await cached_json(request, current_user, (start_date, end_date), compute)
@@ -1,8 +1,11 @@
-from datetime import date
-from typing import Dict, List
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel
 
+from app.models.job import JobKind, JobStatus
+from app.schemas.report import DailyReportFilter
+
 
 class MissedPeriodsItem(BaseModel):
     report_id: str
@@ -24,6 +27,21 @@ class DailySummary(BaseModel):
     summary: str
 
 
+class TimeseriesPoint(BaseModel):
+    bucket_start: date
+    group: str
+    taught: int
+    missed: int
+
+
+class CoverageStats(BaseModel):
+    reports: int
+    missed_distribution: List[int]
+    slot_miss_rates: List[float]
+    missed_percentiles: Dict[str, float]
+    teacher_load_percentiles: Dict[str, float]
+
+
 class MissedPeriodsResponse(BaseModel):
     items: List[MissedPeriodsItem]
 
@@ -34,3 +52,29 @@ class WorkloadResponse(BaseModel):
 
 class DailySummaryResponse(BaseModel):
     items: List[DailySummary]
+
+
+class TimeseriesResponse(BaseModel):
+    bucket: str
+    group_by: str
+    items: List[TimeseriesPoint]
+    truncated: bool = False
+
+
+class AnalyticsJobCreate(BaseModel):
+    kind: JobKind
+    engine: Literal["database", "numpy"] = "database"
+    filters: DailyReportFilter = DailyReportFilter()
+
+
+class AnalyticsJobOut(BaseModel):
+    id: str
+    kind: JobKind
+    engine: str
+    status: JobStatus
+    filters: Dict[str, Any]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[List[Dict[str, Any]]] = None
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
+from beanie import PydanticObjectId
 from pydantic import BaseModel, EmailStr, Field
 
 from app.models.user import Role
@@ -20,6 +21,17 @@ class Token(BaseModel):
 class TokenPayload(BaseModel):
     sub: str | None = None
     exp: int | None = None
+    role: Role | None = None
+    display_id: str | None = None
+    ver: int = 0
+
+
+class TokenPrincipal(BaseModel):
+    """The caller as described by their token's claims, without a database lookup."""
+
+    id: PydanticObjectId
+    role: Role
+    display_id: Optional[str] = None
 
 
 class UserPublic(BaseModel):
@@ -35,3 +47,25 @@ class UserPublic(BaseModel):
 
 class SignupRequest(LoginRequest):
     name: str
+
+
+class BulkUserCreate(BaseModel):
+    name: str = Field(min_length=1)
+    email: EmailStr
+    password: str = Field(min_length=6)
+    role: Role = Role.teacher
+
+
+class BulkUserResult(BaseModel):
+    index: int
+    ok: bool
+    id: Optional[str] = None
+    email: Optional[str] = None
+    display_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkUserResponse(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkUserResult]
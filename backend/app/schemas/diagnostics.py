@@ -0,0 +1,23 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class QueryPlan(BaseModel):
+    filters: List[str]
+    # "find" for the GET /reports page query, otherwise the name of the aggregation.
+    query: str = "find"
+    stages: List[str]
+    indexes: List[str]
+    collscan: bool
+    # True when a filtered query scans an index end to end, e.g. walking (date, _id) just for the sort.
+    unbounded: bool = False
+    # True when the plan reads only index keys, with no FETCH of whole documents.
+    covered: bool = False
+
+
+class QueryPlanReport(BaseModel):
+    ok: bool
+    plans: List[QueryPlan]
+    # Aggregations whose indexes are meant to cover them; ``ok`` also requires each of them to be covered.
+    covered_aggregations: List[QueryPlan] = []
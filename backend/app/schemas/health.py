@@ -0,0 +1,30 @@
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class DatabaseHealth(BaseModel):
+    ok: bool
+    ping_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ServerPool(BaseModel):
+    open: int
+    checked_out: int
+
+
+class PoolHealth(BaseModel):
+    max_pool_size: int
+    min_pool_size: int
+    open: int
+    checked_out: int
+    utilization: float
+    servers: Dict[str, ServerPool]
+
+
+class HealthStatus(BaseModel):
+    status: Literal["ok", "unavailable"]
+    database: DatabaseHealth
+    pool: PoolHealth
+    analytics_read_preference: str
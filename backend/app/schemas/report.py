@@ -1,5 +1,6 @@
+import datetime as dt
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from beanie import PydanticObjectId
 from pydantic import BaseModel, Field, field_validator
@@ -59,3 +60,52 @@ class DailyReportFilter(BaseModel):
     subject_teacher_id: Optional[PydanticObjectId] = None
     start_date: Optional[date] = None
     end_date: Optional[date] = None
+    missed_period: Optional[int] = Field(None, ge=1, le=8)
+    fully_signed: Optional[bool] = None
+
+
+class DailyReportListItem(BaseModel):
+    id: str
+    # Annotated via the module so the field name does not shadow the type.
+    date: Optional[dt.date] = None
+    class_name: Optional[str] = None
+    class_teacher_id: Optional[PydanticObjectId] = None
+    periods: Optional[List[PeriodOut]] = None
+    total_periods_taught: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class DailyReportPage(BaseModel):
+    items: List[DailyReportListItem]
+    next_cursor: Optional[str] = None
+
+
+class BulkReportResult(BaseModel):
+    index: int
+    ok: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkReportResponse(BaseModel):
+    inserted: int
+    failed: int
+    items: List[BulkReportResult]
+
+
+class ReportSummary(BaseModel):
+    id: str
+    date: date
+    class_name: str
+    class_teacher_id: str
+    taught: int
+    missed: int
+    signed_mask: int
+
+
+class ReportEvent(BaseModel):
+    """A newly submitted report plus what it adds to the analytics views."""
+
+    report: ReportSummary
+    # Periods taught per subject teacher in this report, i.e. the change to /analytics/workload.
+    workload: Dict[str, int]
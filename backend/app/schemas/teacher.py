@@ -0,0 +1,32 @@
+from datetime import date
+from typing import List
+
+from pydantic import BaseModel
+
+
+class TeacherPeriod(BaseModel):
+    date: date
+    class_name: str
+    period_number: int
+    subject: str
+    signed: bool
+    report_id: str
+
+
+class TeacherPeriodsResponse(BaseModel):
+    teacher_id: str
+    items: List[TeacherPeriod]
+    truncated: bool = False
+
+
+class TeacherDayWorkload(BaseModel):
+    date: date
+    assigned: int
+    taught: int
+
+
+class TeacherWorkloadResponse(BaseModel):
+    teacher_id: str
+    assigned: int
+    taught: int
+    days: List[TeacherDayWorkload]
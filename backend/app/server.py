@@ -0,0 +1,81 @@
+"""Production entry point: ``python -m app.server [--workers N] [--no-migrate]``.
+
+The parent process is the leader. It connects once, builds every index and, unless ``--no-migrate`` is
+given, runs the idempotent data migrations. Only then does it start the uvicorn workers. They inherit
+``SKIP_INDEX_CREATION=true``, so a deploy that restarts many workers does not send the same index builds
+from every one of them. Each worker logs its own startup phases when its lifespan starts.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from app.config import Settings, get_settings
+from app.services.metrics import startup
+
+logger = logging.getLogger("app.startup")
+
+
+async def prepare_database(settings: Settings, motor_client: Any = None, migrate: bool = True) -> Dict[str, Any]:
+    """Leader-only setup: build indexes and optionally run migrations; returns the migration results."""
+    with startup.phase("leader_import"):
+        # Imported here so that `--help` and argument errors do not pay for beanie, motor and the models.
+        from app.db import create_motor_client, init_database
+        from app.services import migrations
+
+    created_client = motor_client is None
+    if created_client:
+        with startup.phase("leader_connect"):
+            motor_client = create_motor_client(settings)
+    results: Dict[str, Any] = {}
+    try:
+        with startup.phase("indexes"):
+            await init_database(motor_client, settings, skip_indexes=False)
+        if migrate:
+            with startup.phase("migrations"):
+                results = await migrations.run_all()
+    finally:
+        if created_client:
+            motor_client.close()
+    return results
+
+
+def worker_environment(environ: Optional[Dict[str, str]] = None) -> None:
+    """Make every worker started after this skip index creation, including an in-process single worker."""
+    environ = os.environ if environ is None else environ
+    environ["SKIP_INDEX_CREATION"] = "true"
+    get_settings.cache_clear()
+
+
+def main(argv: Optional[list] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.server", description="Run the Teacher AMS API")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers)
+    parser.add_argument(
+        "--migrate",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="run idempotent data migrations before serving (default: yes)",
+    )
+    parser.add_argument(
+        "--skip-setup", action="store_true", help="skip leader setup, e.g. when another instance already ran it"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.skip_setup:
+        results = asyncio.run(prepare_database(settings, migrate=args.migrate))
+        logger.info("leader setup done: %s %s", startup.summary(), results or "")
+    worker_environment()
+
+    import uvicorn
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,268 @@
-from collections import Counter
-from datetime import date
-from typing import List
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Literal, Sequence, Tuple, TypeVar
 
-from app.models.report import DailyReport
-from app.schemas.analytics import DailySummary, MissedPeriodsItem, WorkloadItem
+from beanie.odm.utils.encoder import Encoder
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.models.report import PERIODS_PER_DAY, DailyReport
+from app.schemas.analytics import CoverageStats, DailySummary, MissedPeriodsItem, TimeseriesPoint, WorkloadItem
 from app.schemas.report import DailyReportFilter
+from app.services import columnar, counter, rollup
+from app.services.database import analytics_collection
+from app.services.metrics import MetricsRegistry, registry
+from app.services.query import as_date, build_query, teacher_slots_stage
+
+
+Bucket = Literal["week", "month", "term"]
+GroupBy = Literal["class", "teacher"]
+Engine = Literal["database", "numpy"]
+
+MAX_TIMESERIES_ROWS = 5000
+DAY_MS = 24 * 60 * 60 * 1000
+
+T = TypeVar("T")
+
+registry.describe("analytics_singleflight_calls_total", "Analytics calls, by whether they ran or joined an in-flight call.")
+
+
+class SingleFlight:
+    """Lets concurrent callers asking for the same key share one in-flight computation.
+
+    The first caller starts the work as a task; later callers with the same key await that task instead of
+    repeating the query. The task is shielded, so a caller that disconnects does not cancel it for the others.
+    Results are shared objects and must not be mutated by callers.
+    """
+
+    def __init__(self, metrics: MetricsRegistry = registry) -> None:
+        self.metrics = metrics
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+            self.metrics.inc("analytics_singleflight_calls_total", query=name, outcome="executed")
+        else:
+            self.metrics.inc("analytics_singleflight_calls_total", query=name, outcome="coalesced")
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+singleflight = SingleFlight()
+
+
+def _key_part(value: Any) -> Hashable:
+    return value.model_dump_json() if isinstance(value, BaseModel) else value
+
+
+def coalesced(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Route calls to ``fn`` through ``singleflight``, keyed on its normalized arguments and the reports version.
+
+    The version keeps a call made after a report write from joining a computation that started before it.
+    Under ``cached_json`` it is the version the response cache already read, so coalescing adds no round-trip.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        version = await counter.reports_version()
+        key = (fn.__name__, version, *(_key_part(value) for value in bound.arguments.values()))
+        return await singleflight.do(fn.__name__, key, lambda: fn(*bound.args, **bound.kwargs))
+
+    return wrapper
 
 
 async def fetch_reports(filters: DailyReportFilter) -> List[DailyReport]:
     return await DailyReport.find_many(build_query(filters)).to_list()
 
 
-def build_query(filters: DailyReportFilter) -> dict:
-    query: dict = {}
-    if filters.class_name:
-        query["class_name"] = filters.class_name
-    if filters.class_teacher_id:
-        query["class_teacher_id"] = filters.class_teacher_id
-    if filters.subject_teacher_id:
-        query["periods.subject_teacher_id"] = filters.subject_teacher_id
-    if filters.start_date and filters.end_date:
-        query["date"] = {"$gte": filters.start_date, "$lte": filters.end_date}
-    elif filters.start_date:
-        query["date"] = {"$gte": filters.start_date}
-    elif filters.end_date:
-        query["date"] = {"$lte": filters.end_date}
-    return query
-
-
-async def missed_periods(filters: DailyReportFilter) -> List[MissedPeriodsItem]:
-    reports = await fetch_reports(filters)
+def report_pipeline(filters: DailyReportFilter, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"$match": Encoder().encode(build_query(filters))}, *pipeline]
+
+
+async def aggregate_reports(filters: DailyReportFilter, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run ``pipeline`` after a ``$match`` on ``filters`` and return the raw result rows."""
+    return await analytics_collection(DailyReport).aggregate(report_pipeline(filters, pipeline)).to_list(length=None)
+
+
+def workload_pipeline() -> List[Dict[str, Any]]:
+    return [
+        teacher_slots_stage(),
+        {"$unwind": "$teacher_slots"},
+        {"$match": {"teacher_slots.taught": {"$gt": 0}}},
+        {"$group": {"_id": "$teacher_slots.subject_teacher_id", "periods_taught": {"$sum": "$teacher_slots.taught"}}},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def report_totals_pipeline() -> List[Dict[str, Any]]:
+    return [
+        {
+            "$project": {
+                "_id": 1,
+                "class_name": 1,
+                "date": 1,
+                "taught": "$total_periods_taught",
+                "missed": {"$subtract": [PERIODS_PER_DAY, "$total_periods_taught"]},
+            }
+        },
+    ]
+
+
+def use_rollups(filters: DailyReportFilter) -> bool:
+    # Rollups are keyed by class and class teacher, so they cannot answer "reports a subject teacher appears in".
+    return get_settings().analytics_use_rollups and filters.subject_teacher_id is None and not coverage_filtered(filters)
+
+
+def coverage_filtered(filters: DailyReportFilter) -> bool:
+    return filters.missed_period is not None or filters.fully_signed is not None
+
+
+@coalesced
+async def missed_periods(filters: DailyReportFilter, engine: Engine = "database") -> List[MissedPeriodsItem]:
+    if engine == "numpy":
+        return (await columnar.load_window(filters)).missed_periods()
+    if use_rollups(filters):
+        rows = await rollup.missed_rows(filters)
+    else:
+        rows = await aggregate_reports(filters, report_totals_pipeline())
     return [
         MissedPeriodsItem(
-            report_id=str(r.id),
-            class_name=r.class_name,
-            date=r.date,
-            missed_periods=8 - r.total_periods_taught,
+            report_id=str(row["_id"]),
+            class_name=row["class_name"],
+            date=as_date(row["date"]),
+            missed_periods=row["missed"],
         )
-        for r in reports
+        for row in rows
     ]
 
 
-async def workload(filters: DailyReportFilter) -> List[WorkloadItem]:
-    reports = await fetch_reports(filters)
-    counter: Counter[str] = Counter()
-    for report in reports:
-        for period in report.periods:
-            if period.signed:
-                counter[str(period.subject_teacher_id)] += 1
-    return [WorkloadItem(subject_teacher_id=k, periods_taught=v) for k, v in counter.items()]
+@coalesced
+async def workload(filters: DailyReportFilter, engine: Engine = "database") -> List[WorkloadItem]:
+    if engine == "numpy":
+        return (await columnar.load_window(filters)).workload()
+    if use_rollups(filters):
+        rows = await rollup.workload_rows(filters)
+    else:
+        rows = await aggregate_reports(filters, workload_pipeline())
+    return [WorkloadItem(subject_teacher_id=str(row["_id"]), periods_taught=row["periods_taught"]) for row in rows]
 
 
-async def daily_summary(filters: DailyReportFilter) -> List[DailySummary]:
-    reports = await fetch_reports(filters)
+@coalesced
+async def daily_summary(filters: DailyReportFilter, engine: Engine = "database") -> List[DailySummary]:
+    if engine == "numpy":
+        return (await columnar.load_window(filters)).daily_summaries()
+    rows = await aggregate_reports(filters, report_totals_pipeline())
     summaries: List[DailySummary] = []
-    for r in reports:
-        missed = 8 - r.total_periods_taught
+    for row in rows:
+        report_date = as_date(row["date"])
         summary_text = (
-            f"Class {r.class_name} on {r.date.isoformat()}: {r.total_periods_taught}/8 periods taught."
+            f"Class {row['class_name']} on {report_date.isoformat()}: {row['taught']}/{PERIODS_PER_DAY} periods taught."
         )
         summaries.append(
             DailySummary(
-                class_name=r.class_name,
-                date=r.date,
-                taught=r.total_periods_taught,
-                missed=missed,
+                class_name=row["class_name"],
+                date=report_date,
+                taught=row["taught"],
+                missed=row["missed"],
                 summary=summary_text,
             )
         )
     return summaries
+
+
+def bucket_start_expression(bucket: Bucket, term_start_months: Sequence[int]) -> Dict[str, Any]:
+    """Aggregation expression mapping ``$date`` to the first day of its week (Monday), month or term."""
+    if bucket == "week":
+        # $dayOfWeek is 1 for Sunday, so (dow + 5) % 7 is the number of days since Monday.
+        days_since_monday = {"$mod": [{"$add": [{"$dayOfWeek": "$date"}, 5]}, 7]}
+        return {"$subtract": ["$date", {"$multiply": [days_since_monday, DAY_MS]}]}
+    if bucket == "month":
+        return {"$dateFromParts": {"year": {"$year": "$date"}, "month": {"$month": "$date"}, "day": 1}}
+
+    starts = sorted(term_start_months)
+    report_month = {"$month": "$date"}
+    # Months before the first term start belong to the last term of the previous year.
+    year = {
+        "$cond": [{"$lt": [report_month, starts[0]]}, {"$subtract": [{"$year": "$date"}, 1]}, {"$year": "$date"}]
+    }
+    month: Any = starts[-1]
+    for start in starts:
+        # Wrapping in ascending order leaves the latest term start as the outermost test.
+        month = {"$cond": [{"$gte": [report_month, start]}, start, month]}
+    return {"$dateFromParts": {"year": year, "month": month, "day": 1}}
+
+
+def timeseries_group(bucket_expr: Dict[str, Any], group_field: str, taught: Any, missed: Any) -> List[Dict[str, Any]]:
+    return [
+        {
+            "$group": {
+                "_id": {"bucket": bucket_expr, "group": group_field},
+                "taught": {"$sum": taught},
+                "missed": {"$sum": missed},
+            }
+        },
+        {"$sort": {"_id.bucket": 1, "_id.group": 1}},
+        {"$limit": MAX_TIMESERIES_ROWS + 1},
+    ]
+
+
+def timeseries_pipeline(filters: DailyReportFilter, bucket_expr: Dict[str, Any], group_by: GroupBy) -> List[Dict[str, Any]]:
+    """The stages after ``$match`` that compute a timeseries from ``daily_reports`` when rollups cannot."""
+    if group_by == "teacher":
+        pipeline: List[Dict[str, Any]] = [teacher_slots_stage(), {"$unwind": "$teacher_slots"}]
+        if filters.subject_teacher_id:
+            pipeline.append({"$match": {"teacher_slots.subject_teacher_id": filters.subject_teacher_id}})
+        unsigned = {"$subtract": ["$teacher_slots.periods", "$teacher_slots.taught"]}
+        return pipeline + timeseries_group(
+            bucket_expr, "$teacher_slots.subject_teacher_id", "$teacher_slots.taught", unsigned
+        )
+    missed = {"$subtract": [PERIODS_PER_DAY, "$total_periods_taught"]}
+    return timeseries_group(bucket_expr, "$class_name", "$total_periods_taught", missed)
+
+
+@coalesced
+async def timeseries(
+    filters: DailyReportFilter, bucket: Bucket = "week", group_by: GroupBy = "class"
+) -> Tuple[List[TimeseriesPoint], bool]:
+    """Taught/missed totals per (bucket, class or teacher); the second value is True if rows were cut off."""
+    bucket_expr = bucket_start_expression(bucket, get_settings().term_start_months)
+    if group_by == "teacher" and get_settings().analytics_use_rollups and not coverage_filtered(filters):
+        rows = await rollup.teacher_timeseries_rows(
+            filters, timeseries_group(bucket_expr, "$subject_teacher_id", "$signed", "$missed")
+        )
+    elif group_by == "class" and use_rollups(filters):
+        rows = await rollup.class_timeseries_rows(
+            filters, timeseries_group(bucket_expr, "$class_name", "$signed", "$missed")
+        )
+    else:
+        rows = await aggregate_reports(filters, timeseries_pipeline(filters, bucket_expr, group_by))
+
+    truncated = len(rows) > MAX_TIMESERIES_ROWS
+    return [
+        TimeseriesPoint(
+            bucket_start=as_date(row["_id"]["bucket"]),
+            group=str(row["_id"]["group"]),
+            taught=row["taught"],
+            missed=row["missed"],
+        )
+        for row in rows[:MAX_TIMESERIES_ROWS]
+    ], truncated
+
+
+@coalesced
+async def coverage_stats(filters: DailyReportFilter) -> CoverageStats:
+    return (await columnar.load_window(filters)).coverage_stats()
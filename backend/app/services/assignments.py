@@ -0,0 +1,163 @@
+import asyncio
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo.errors import BulkWriteError
+
+from app.models.assignment import PeriodAssignment
+from app.models.report import DailyReport
+from app.schemas.teacher import TeacherDayWorkload, TeacherPeriod, TeacherWorkloadResponse
+from app.services import counter
+from app.services.database import DUPLICATE_KEY, analytics_collection
+from app.services.query import as_date
+
+REBUILD_BATCH_SIZE = 1000
+ROW_KEY = ("subject_teacher_id", "date", "class_name", "period_number")
+
+
+def assignment_rows(
+    report_id: Any, report_date: date, class_name: str, periods: Iterable[Any], written_at: datetime
+) -> List[Dict[str, Any]]:
+    """``period_assignments`` rows for one report; ``periods`` may be models or raw dicts."""
+    rows = []
+    for period in periods:
+        period = period if isinstance(period, dict) else period.model_dump()
+        rows.append(
+            {
+                "subject_teacher_id": period["subject_teacher_id"],
+                "date": datetime.combine(report_date, time.min),
+                "class_name": class_name,
+                "period_number": period["period_number"],
+                "subject": period["subject"],
+                "signed": period["signed"],
+                "report_id": report_id,
+                "written_at": written_at,
+            }
+        )
+    return rows
+
+
+async def _insert(rows: List[Dict[str, Any]]) -> int:
+    if not rows:
+        return 0
+    try:
+        result = await PeriodAssignment.get_motor_collection().insert_many(rows, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as exc:
+        # Rows that already exist are fine: the write is being repeated.
+        errors = exc.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        return exc.details.get("nInserted", 0)
+
+
+async def add_reports(reports: List[DailyReport]) -> None:
+    rows = []
+    written_at = datetime.utcnow()
+    for report in reports:
+        rows.extend(assignment_rows(report.id, report.date, report.class_name, report.periods, written_at))
+    await _insert(rows)
+
+
+async def remove_reports(reports: List[DailyReport]) -> None:
+    await PeriodAssignment.get_motor_collection().delete_many({"report_id": {"$in": [report.id for report in reports]}})
+
+
+async def rebuild_assignments() -> Dict[str, int]:
+    """Recompute ``period_assignments`` from ``daily_reports``; also the backfill for reports written before it existed.
+
+    Each report's rows are upserted in place, and rows that no report produces any more are deleted at the
+    end, so /teachers keeps answering from the old rows while this runs.
+    """
+    started = datetime.utcnow()
+    collection = PeriodAssignment.get_motor_collection()
+    cursor = DailyReport.get_motor_collection().find({}, {"date": 1, "class_name": 1, "periods": 1})
+    written = 0
+    batch: List[Any] = []
+    async for doc in cursor.batch_size(REBUILD_BATCH_SIZE):
+        for row in assignment_rows(doc["_id"], as_date(doc["date"]), doc["class_name"], doc["periods"], started):
+            batch.append(collection.replace_one({name: row[name] for name in ROW_KEY}, row, upsert=True))
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            await asyncio.gather(*batch)
+            written += len(batch)
+            batch = []
+    await asyncio.gather(*batch)
+    written += len(batch)
+    # Rows inserted by report submissions during the rebuild are newer than ``started`` and stay.
+    await collection.delete_many({"$or": [{"written_at": {"$lt": started}}, {"written_at": {"$exists": False}}]})
+    # Cached teacher and analytics responses were computed from the old rows.
+    await counter.increment(counter.REPORTS_VERSION)
+    return {"period_assignments": written}
+
+
+def teacher_query(teacher_id: PydanticObjectId, start_date: Optional[date], end_date: Optional[date]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"subject_teacher_id": teacher_id}
+    date_range: Dict[str, datetime] = {}
+    if start_date:
+        date_range["$gte"] = datetime.combine(start_date, time.min)
+    if end_date:
+        date_range["$lte"] = datetime.combine(end_date, time.min)
+    if date_range:
+        query["date"] = date_range
+    return query
+
+
+async def teacher_periods(
+    teacher_id: PydanticObjectId,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    signed: Optional[bool],
+    limit: int,
+) -> Tuple[List[TeacherPeriod], bool]:
+    query = teacher_query(teacher_id, start_date, end_date)
+    if signed is not None:
+        query["signed"] = signed
+    rows = (
+        await analytics_collection(PeriodAssignment)
+        .find(query, {"_id": 0, "subject_teacher_id": 0})
+        .sort([("date", 1), ("class_name", 1), ("period_number", 1)])
+        .limit(limit + 1)
+        .to_list(length=None)
+    )
+    items = [
+        TeacherPeriod(
+            date=as_date(row["date"]),
+            class_name=row["class_name"],
+            period_number=row["period_number"],
+            subject=row["subject"],
+            signed=row["signed"],
+            report_id=str(row["report_id"]),
+        )
+        for row in rows[:limit]
+    ]
+    return items, len(rows) > limit
+
+
+def workload_pipeline(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": query},
+        {
+            "$group": {
+                "_id": "$date",
+                "assigned": {"$sum": 1},
+                "taught": {"$sum": {"$cond": ["$signed", 1, 0]}},
+            }
+        },
+        {"$sort": {"_id": 1}},
+    ]
+
+
+async def teacher_workload(
+    teacher_id: PydanticObjectId, start_date: Optional[date], end_date: Optional[date]
+) -> TeacherWorkloadResponse:
+    rows = await analytics_collection(PeriodAssignment).aggregate(
+        workload_pipeline(teacher_query(teacher_id, start_date, end_date))
+    ).to_list(length=None)
+    days = [TeacherDayWorkload(date=as_date(row["_id"]), assigned=row["assigned"], taught=row["taught"]) for row in rows]
+    return TeacherWorkloadResponse(
+        teacher_id=str(teacher_id),
+        assigned=sum(day.assigned for day in days),
+        taught=sum(day.taught for day in days),
+        days=days,
+    )
@@ -1,31 +1,184 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional
 
+from beanie import PydanticObjectId
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from pymongo import ReturnDocument
 
-from app.config import Settings
+from app.config import Settings, get_settings
+from app.models.user import User
+from app.services.cache import invalidate_user
+from app.services.metrics import phase
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# OWASP's current figure for PBKDF2-SHA256; passlib's own default, 29000, is what older hashes here use.
+PBKDF2_ROUNDS = 600_000
+
+
+@lru_cache
+def password_context(rounds: int = PBKDF2_ROUNDS) -> CryptContext:
+    """Hashes below ``rounds`` are flagged by needs_update and upgraded on the next successful login."""
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+    )
+
+
+pwd_context = password_context()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def get_password_hash(password: str, rounds: int = PBKDF2_ROUNDS) -> str:
+    return password_context(rounds).hash(password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str, rounds: int = PBKDF2_ROUNDS
+) -> tuple[bool, Optional[str]]:
+    return password_context(rounds).verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs pbkdf2 work on a bounded executor so hashing never blocks the event loop."""
+
+    def __init__(self, executor: Executor, max_concurrency: int, rounds: int = PBKDF2_ROUNDS) -> None:
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.rounds = rounds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+
+    async def _run(self, func, *args):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            with phase("password_hash"):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update_password, plain_password, hashed_password, self.rounds)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
 
 
-def create_access_token(subject: str, settings: Settings, expires_delta: Optional[timedelta] = None) -> tuple[str, datetime]:
+@lru_cache
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    executor_cls = ProcessPoolExecutor if settings.password_hash_executor == "process" else ThreadPoolExecutor
+    executor = executor_cls(max_workers=settings.password_hash_workers)
+    return PasswordHasher(executor, settings.password_hash_max_concurrency, settings.password_hash_rounds)
+
+
+def create_access_token(
+    subject: str,
+    settings: Settings,
+    expires_delta: Optional[timedelta] = None,
+    claims: Optional[Dict[str, Any]] = None,
+) -> tuple[str, datetime]:
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode = {"sub": subject, "exp": expire}
+    to_encode = {**(claims or {}), "sub": subject, "exp": expire}
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
     return encoded_jwt, expire
 
 
+def user_claims(user: User) -> Dict[str, Any]:
+    """Claims that let read endpoints authorize a token without loading the user."""
+    return {"role": user.role.value, "display_id": user.display_id, "ver": user.token_version}
+
+
 def decode_token(token: str, settings: Settings) -> dict:
     try:
         return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
     except JWTError as exc:  # pragma: no cover
         raise exc
+
+
+class TokenRevocations:
+    """The minimum accepted token version of every user who has revoked their tokens.
+
+    Only users with ``token_version > 0`` are loaded, so the map stays small. It is reloaded with a single
+    query once it is ``ttl`` seconds old, and checking a token does not touch the database in between.
+    A revocation takes effect immediately in the process that made it and within ``ttl`` everywhere else.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._versions: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    async def _refresh(self) -> None:
+        rows = await User.get_motor_collection().find({"token_version": {"$gt": 0}}, {"token_version": 1}).to_list(
+            length=None
+        )
+        self._versions = {str(row["_id"]): row["token_version"] for row in rows}
+        self._loaded_at = time.monotonic()
+
+    async def min_version(self, user_id: str) -> int:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    with phase("revocations"):
+                        await self._refresh()
+        return self._versions.get(user_id, 0)
+
+    async def revoke(self, user_id: PydanticObjectId) -> int:
+        """Invalidate every token issued to ``user_id`` so far and return the user's new token version."""
+        doc = await User.get_motor_collection().find_one_and_update(
+            {"_id": user_id},
+            {"$inc": {"token_version": 1}},
+            projection={"token_version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        self._versions[str(user_id)] = doc["token_version"]
+        invalidate_user(user_id)
+        return doc["token_version"]
+
+    def clear(self) -> None:
+        self._versions = {}
+        self._loaded_at = None
+
+
+@lru_cache
+def get_token_revocations() -> TokenRevocations:
+    return TokenRevocations(ttl=get_settings().token_revocation_refresh_seconds)
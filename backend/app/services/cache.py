@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+from app.config import get_settings
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """A small in-process LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+@lru_cache
+def get_user_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(max_size=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds)
+
+
+@lru_cache
+def get_token_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(max_size=settings.token_cache_max_size, ttl=settings.token_cache_ttl_seconds)
+
+
+@lru_cache
+def get_response_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(max_size=settings.response_cache_max_size, ttl=settings.response_cache_ttl_seconds)
+
+
+def invalidate_user(user_id: Any) -> None:
+    get_user_cache().invalidate(str(user_id))
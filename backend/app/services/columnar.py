@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List
+
+from beanie.odm.utils.encoder import Encoder
+from fastapi import HTTPException, status
+
+from app.models.report import PERIODS_PER_DAY, DailyReport, PeriodEntry, summarize_periods
+from app.schemas.analytics import CoverageStats, DailySummary, MissedPeriodsItem, WorkloadItem
+from app.schemas.report import DailyReportFilter
+from app.services.database import analytics_collection
+from app.services.query import as_date, build_query
+
+# numpy is optional and slow to import, so it is loaded on first use rather than at worker startup.
+np: Any = None
+
+LOAD_BATCH_SIZE = 5000
+PERCENTILES = (50, 90, 95, 99)
+WINDOW_PROJECTION = {
+    "date": 1,
+    "class_name": 1,
+    "signed_mask": 1,
+    "teacher_slots.subject_teacher_id": 1,
+    "teacher_slots.slots": 1,
+}
+
+
+def _load_numpy() -> bool:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - numpy is optional
+            return False
+        np = numpy
+    return True
+
+
+def available() -> bool:
+    return _load_numpy()
+
+
+@dataclass
+class ReportWindow:
+    """A filtered set of reports held as parallel arrays, one row per report.
+
+    ``signed_mask`` bit ``n - 1`` is set when period ``n`` was signed; ``slot_teachers[:, n - 1]`` is the
+    code of that period's subject teacher.
+    """
+
+    report_ids: List[str]
+    dates: "np.ndarray"  # int32 proleptic ordinals
+    class_codes: "np.ndarray"  # int32 indexes into class_names
+    slot_teachers: "np.ndarray"  # (reports, 8) int32 indexes into teacher_ids
+    signed_mask: "np.ndarray"  # uint8
+    class_names: List[str]
+    teacher_ids: List[str]
+
+    def __len__(self) -> int:
+        return len(self.report_ids)
+
+    def signed_slots(self) -> "np.ndarray":
+        return ((self.signed_mask[:, None] >> np.arange(PERIODS_PER_DAY, dtype=np.uint8)) & 1).astype(bool)
+
+    def taught(self) -> "np.ndarray":
+        return np.unpackbits(self.signed_mask[:, None], axis=1).sum(axis=1).astype(np.int32)
+
+    def missed(self) -> "np.ndarray":
+        return PERIODS_PER_DAY - self.taught()
+
+    def workload_counts(self) -> "np.ndarray":
+        return np.bincount(self.slot_teachers[self.signed_slots()], minlength=len(self.teacher_ids))
+
+    def workload(self) -> List[WorkloadItem]:
+        counts = self.workload_counts()
+        order = sorted(np.flatnonzero(counts), key=lambda code: self.teacher_ids[code])
+        return [WorkloadItem(subject_teacher_id=self.teacher_ids[code], periods_taught=int(counts[code])) for code in order]
+
+    def missed_periods(self) -> List[MissedPeriodsItem]:
+        missed = self.missed()
+        return [
+            MissedPeriodsItem(
+                report_id=self.report_ids[i],
+                class_name=self.class_names[self.class_codes[i]],
+                date=date.fromordinal(int(self.dates[i])),
+                missed_periods=int(missed[i]),
+            )
+            for i in range(len(self))
+        ]
+
+    def daily_summaries(self) -> List[DailySummary]:
+        taught = self.taught()
+        summaries = []
+        for i in range(len(self)):
+            report_date = date.fromordinal(int(self.dates[i]))
+            class_name = self.class_names[self.class_codes[i]]
+            summaries.append(
+                DailySummary(
+                    class_name=class_name,
+                    date=report_date,
+                    taught=int(taught[i]),
+                    missed=PERIODS_PER_DAY - int(taught[i]),
+                    summary=f"Class {class_name} on {report_date.isoformat()}: {int(taught[i])}/{PERIODS_PER_DAY} periods taught.",
+                )
+            )
+        return summaries
+
+    def coverage_stats(self) -> CoverageStats:
+        if not len(self):
+            return CoverageStats(
+                reports=0,
+                missed_distribution=[0] * (PERIODS_PER_DAY + 1),
+                slot_miss_rates=[0.0] * PERIODS_PER_DAY,
+                missed_percentiles={},
+                teacher_load_percentiles={},
+            )
+        missed = self.missed()
+        counts = self.workload_counts()
+        active = counts[counts > 0]
+        return CoverageStats(
+            reports=len(self),
+            missed_distribution=np.bincount(missed, minlength=PERIODS_PER_DAY + 1).tolist(),
+            slot_miss_rates=(1.0 - self.signed_slots().mean(axis=0)).round(4).tolist(),
+            missed_percentiles=_percentiles(missed),
+            teacher_load_percentiles=_percentiles(active) if active.size else {},
+        )
+
+
+def _slot_row(teacher_slots: List[Dict[str, Any]], teacher_codes: Dict[Any, int]) -> List[int]:
+    row = [0] * PERIODS_PER_DAY
+    for share in teacher_slots:
+        code = teacher_codes.setdefault(share["subject_teacher_id"], len(teacher_codes))
+        for slot in range(PERIODS_PER_DAY):
+            if share["slots"] & (1 << slot):
+                row[slot] = code
+    return row
+
+
+def _percentiles(values: "np.ndarray") -> Dict[str, float]:
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+async def load_window(filters: DailyReportFilter) -> ReportWindow:
+    if not _load_numpy():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="The numpy analytics engine is not installed",
+        )
+    class_codes: Dict[str, int] = {}
+    teacher_codes: Dict[Any, int] = {}
+    report_ids: List[str] = []
+    dates: List[int] = []
+    classes: List[int] = []
+    slots: List[List[int]] = []
+    masks: List[int] = []
+    # Reports stored before signed_mask/teacher_slots existed and not yet backfilled, by row.
+    unsummarized: Dict[Any, int] = {}
+
+    cursor = (
+        analytics_collection(DailyReport)
+        .find(Encoder().encode(build_query(filters)), WINDOW_PROJECTION)
+        .batch_size(LOAD_BATCH_SIZE)
+    )
+    async for doc in cursor:
+        report_ids.append(str(doc["_id"]))
+        dates.append(as_date(doc["date"]).toordinal())
+        classes.append(class_codes.setdefault(doc["class_name"], len(class_codes)))
+        if "signed_mask" not in doc or "teacher_slots" not in doc:
+            unsummarized[doc["_id"]] = len(slots)
+            slots.append([0] * PERIODS_PER_DAY)
+            masks.append(0)
+            continue
+        slots.append(_slot_row(doc["teacher_slots"], teacher_codes))
+        masks.append(doc["signed_mask"])
+    if unsummarized:
+        # Summarize those from their periods, in one extra query rather than loading periods for every report.
+        async for doc in analytics_collection(DailyReport).find({"_id": {"$in": list(unsummarized)}}, {"periods": 1}):
+            signed_mask, teacher_slots = summarize_periods(PeriodEntry(**period) for period in doc["periods"])
+            row = unsummarized[doc["_id"]]
+            slots[row] = _slot_row([share.model_dump() for share in teacher_slots], teacher_codes)
+            masks[row] = signed_mask
+
+    return ReportWindow(
+        report_ids=report_ids,
+        dates=np.array(dates, dtype=np.int32),
+        class_codes=np.array(classes, dtype=np.int32),
+        slot_teachers=np.array(slots, dtype=np.int32).reshape(-1, PERIODS_PER_DAY),
+        signed_mask=np.array(masks, dtype=np.uint8),
+        class_names=list(class_codes),
+        teacher_ids=[str(teacher_id) for teacher_id in teacher_codes],
+    )
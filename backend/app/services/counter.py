@@ -0,0 +1,64 @@
+import asyncio
+from contextvars import ContextVar
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+from app.models.counter import Counter
+
+REPORTS_VERSION = "daily_reports_version"
+DISPLAY_ID_SEQUENCE = "user_display_id"
+# Non-zero once period_assignments has been built from every report stored before it existed.
+ASSIGNMENTS_BACKFILLED = "period_assignments_backfilled"
+
+# The REPORTS_VERSION a request has already read, so the code computing its response need not read it again.
+known_reports_version: ContextVar[Optional[int]] = ContextVar("known_reports_version", default=None)
+
+
+async def increment(name: str, amount: int = 1) -> int:
+    """Atomically add ``amount`` to the counter and return the new value."""
+    doc = await Counter.get_motor_collection().find_one_and_update(
+        {"_id": name},
+        {"$inc": {"value": amount}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["value"]
+
+
+async def current(name: str) -> int:
+    doc = await Counter.get_motor_collection().find_one({"_id": name})
+    return doc["value"] if doc else 0
+
+
+async def reports_version() -> int:
+    known = known_reports_version.get()
+    return known if known is not None else await current(REPORTS_VERSION)
+
+
+class BlockAllocator:
+    """Hands out consecutive integers from a counter, reserving ``block_size`` of them per round-trip.
+
+    Values are unique across processes because each block comes from one atomic ``$inc``. Values reserved
+    by a process that exits are never handed out, so the sequence can have gaps.
+    """
+
+    def __init__(self, name: str, block_size: int) -> None:
+        self.name = name
+        self.block_size = block_size
+        self._next = 1
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def take(self, count: int = 1) -> List[int]:
+        values: List[int] = []
+        async with self._lock:
+            while len(values) < count:
+                if self._next > self._end:
+                    reserve = max(self.block_size, count - len(values))
+                    self._end = await increment(self.name, reserve)
+                    self._next = self._end - reserve + 1
+                n = min(count - len(values), self._end - self._next + 1)
+                values.extend(range(self._next, self._next + n))
+                self._next += n
+        return values
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+import certifi
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from app.config import Settings, get_settings
+from app.models.report import DailyReport
+
+# MongoDB's error code for a unique index violation.
+DUPLICATE_KEY = 11000
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def client_options(settings: Settings) -> Dict[str, Any]:
+    """Keyword arguments for ``AsyncIOMotorClient`` built from the connection settings."""
+    options: Dict[str, Any] = {
+        "tlsCAFile": settings.mongodb_tls_ca_file or certifi.where(),
+        "tlsAllowInvalidCertificates": settings.mongodb_tls_allow_invalid_cert,
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+    }
+    if settings.mongodb_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongodb_max_idle_time_ms
+    if settings.mongodb_compressors:
+        # zstd needs the zstandard package and snappy needs python-snappy; the server picks the first it supports.
+        options["compressors"] = ",".join(settings.mongodb_compressors)
+    return options
+
+
+def analytics_read_preference(settings: Settings) -> Any:
+    return READ_PREFERENCES[settings.mongodb_analytics_read_preference]()
+
+
+def analytics_collection(model: type) -> Any:
+    """The model's collection, routed to secondaries when analytics reads are configured to use them.
+
+    Secondary reads can lag the primary, so a report that was just submitted may not show up yet.
+    Writes and anything that must read its own writes keep using ``get_motor_collection()``.
+    """
+    collection = model.get_motor_collection()
+    settings = get_settings()
+    if settings.mongodb_analytics_read_preference == "primary":
+        return collection
+    return collection.with_options(read_preference=analytics_read_preference(settings))
+
+
+async def ping(timeout: float) -> float:
+    """Round-trip a ``ping`` to the database and return the latency in milliseconds."""
+    database = DailyReport.get_motor_collection().database
+    started = time.perf_counter()
+    await asyncio.wait_for(database.command("ping"), timeout)
+    return (time.perf_counter() - started) * 1000
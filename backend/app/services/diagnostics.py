@@ -0,0 +1,158 @@
+from datetime import date
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Tuple
+
+from beanie import PydanticObjectId
+from beanie.odm.utils.encoder import Encoder
+
+from app.models.assignment import PeriodAssignment
+from app.models.report import DailyReport
+from app.schemas.diagnostics import QueryPlan, QueryPlanReport
+from app.schemas.report import DailyReportFilter
+from app.config import get_settings
+from app.services import analytics, assignments
+from app.services.query import build_query
+
+# Placeholder values are enough: the planner picks an index from the query shape, not the data.
+SAMPLE_FILTER_VALUES: Dict[str, Dict[str, Any]] = {
+    "class_name": {"class_name": "Grade 10-A"},
+    "class_teacher_id": {"class_teacher_id": PydanticObjectId("64f6c5c2e13f1af4efc12345")},
+    "subject_teacher_id": {"subject_teacher_id": PydanticObjectId("64f6c5c2e13f1af4efc12345")},
+    "date_range": {"start_date": date(2024, 9, 1), "end_date": date(2024, 12, 20)},
+    # Both become a $in on signed_mask; fully_signed=False keeps the combined mask list non-empty.
+    "missed_period": {"missed_period": 3},
+    "fully_signed": {"fully_signed": False},
+}
+
+SAMPLE_TEACHER_ID = PydanticObjectId("64f6c5c2e13f1af4efc12345")
+
+REPORT_SORT = {"date": 1, "_id": 1}
+# The default first page of GET /reports asks for one extra row; later pages add a keyset bound on date.
+REPORT_PAGE_LIMIT = 51
+
+FULL_RANGE = {"[MinKey, MaxKey]", "[MaxKey, MinKey]"}
+
+
+def filter_combinations() -> Iterator[Tuple[List[str], DailyReportFilter]]:
+    names = list(SAMPLE_FILTER_VALUES)
+    for size in range(len(names) + 1):
+        for combo in combinations(names, size):
+            values: Dict[str, Any] = {}
+            for name in combo:
+                values.update(SAMPLE_FILTER_VALUES[name])
+            yield list(combo), DailyReportFilter(**values)
+
+
+def plan_stages(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Walk a winning plan tree depth-first, yielding every stage."""
+    yield plan
+    if "inputStage" in plan:
+        yield from plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+    # Newer servers wrap the classic plan tree in queryPlan.
+    if "queryPlan" in plan:
+        yield from plan_stages(plan["queryPlan"])
+
+
+def unbounded_scan(stage: Dict[str, Any]) -> bool:
+    """True when an index scan reads the whole index, e.g. walking (date, _id) only for its sort order."""
+    bounds = stage.get("indexBounds")
+    return bool(bounds) and all(set(ranges) <= FULL_RANGE for ranges in bounds.values())
+
+
+def summarize_plan(filters: List[str], explain: Dict[str, Any], query: str = "find") -> QueryPlan:
+    winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = list(plan_stages(winning))
+    names = [stage["stage"] for stage in stages if "stage" in stage]
+    indexes = [stage["indexName"] for stage in stages if "indexName" in stage]
+    return QueryPlan(
+        filters=filters,
+        query=query,
+        stages=names,
+        indexes=indexes,
+        collscan="COLLSCAN" in names,
+        # Without filters reading every key is the point; with them it means no index matched the filters.
+        unbounded=bool(filters) and any(unbounded_scan(stage) for stage in stages if stage.get("stage") == "IXSCAN"),
+        covered=bool(indexes) and "COLLSCAN" not in names and "FETCH" not in names,
+    )
+
+
+def aggregate_planner(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """The query planner section of an aggregate explain, which is nested under ``$cursor`` unless pushed down."""
+    if "queryPlanner" in explain:
+        return explain
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]
+    return {}
+
+
+async def run_explain(collection: Any, command: Dict[str, Any]) -> Dict[str, Any]:
+    return await collection.database.command("explain", command, verbosity="queryPlanner")
+
+
+def report_pipelines(filters: DailyReportFilter) -> Dict[str, List[Dict[str, Any]]]:
+    """The aggregations that read ``daily_reports`` directly, keyed by the name they are reported under."""
+    bucket_expr = analytics.bucket_start_expression("week", get_settings().term_start_months)
+    return {
+        "report_totals": analytics.report_pipeline(filters, analytics.report_totals_pipeline()),
+        "workload": analytics.report_pipeline(filters, analytics.workload_pipeline()),
+        "timeseries_class": analytics.report_pipeline(
+            filters, analytics.timeseries_pipeline(filters, bucket_expr, "class")
+        ),
+        "timeseries_teacher": analytics.report_pipeline(
+            filters, analytics.timeseries_pipeline(filters, bucket_expr, "teacher")
+        ),
+    }
+
+
+async def explain_report_queries() -> QueryPlanReport:
+    collection = DailyReport.get_motor_collection()
+    plans: List[QueryPlan] = []
+    for names, filters in filter_combinations():
+        find = {
+            "find": collection.name,
+            "filter": Encoder().encode(build_query(filters)),
+            "sort": REPORT_SORT,
+            "limit": REPORT_PAGE_LIMIT,
+        }
+        plans.append(summarize_plan(names, await run_explain(collection, find)))
+        if not names:
+            # An unfiltered aggregation reads every report, so a collection scan is expected.
+            continue
+        for query, pipeline in report_pipelines(filters).items():
+            explain = await run_explain(collection, {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}})
+            plans.append(summarize_plan(names, aggregate_planner(explain), query))
+    covered = [await explain_teacher_workload()]
+    return QueryPlanReport(
+        ok=not any(plan.collscan or plan.unbounded for plan in plans) and all(plan.covered for plan in covered),
+        plans=plans,
+        covered_aggregations=covered,
+    )
+
+
+async def explain_teacher_workload() -> QueryPlan:
+    collection = PeriodAssignment.get_motor_collection()
+    query = assignments.teacher_query(SAMPLE_TEACHER_ID, date(2024, 9, 1), date(2024, 12, 20))
+    explain = await run_explain(
+        collection, {"aggregate": collection.name, "pipeline": assignments.workload_pipeline(query), "cursor": {}}
+    )
+    return summarize_plan(["subject_teacher_id", "date_range"], aggregate_planner(explain), "teacher_workload")
+
+
+def describe(plan: QueryPlan) -> str:
+    return f"{plan.query} on {', '.join(plan.filters) or '(no filters)'}"
+
+
+async def assert_no_collscans() -> None:
+    report = await explain_report_queries()
+    scans = [describe(plan) for plan in report.plans if plan.collscan]
+    if scans:
+        raise AssertionError(f"COLLSCAN for: {'; '.join(scans)}")
+    walks = [describe(plan) for plan in report.plans if plan.unbounded]
+    if walks:
+        raise AssertionError(f"Unbounded index scan for: {'; '.join(walks)}")
+    uncovered = [describe(plan) for plan in report.covered_aggregations if not plan.covered]
+    if uncovered:
+        raise AssertionError(f"Aggregations no longer covered by an index: {'; '.join(uncovered)}")
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from fastapi import HTTPException, status
+
+from app.config import get_settings
+from app.models.report import PERIODS_PER_DAY, DailyReport
+from app.schemas.report import ReportEvent, ReportSummary
+from app.services import fastjson
+from app.services.metrics import MetricsRegistry, registry
+
+logger = logging.getLogger("app.events")
+
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+RETRY_FRAME = b"retry: 5000\n\n"
+CHANGE_STREAM_RETRY_SECONDS = 5
+
+registry.describe("report_stream_events_total", "Report events published to stream subscribers.")
+registry.describe("report_stream_dropped_total", "Buffered report events discarded because a subscriber fell behind.")
+
+
+def report_event(report: DailyReport) -> ReportEvent:
+    return ReportEvent(
+        report=ReportSummary(
+            id=str(report.id),
+            date=report.date,
+            class_name=report.class_name,
+            class_teacher_id=str(report.class_teacher_id),
+            taught=report.total_periods_taught,
+            missed=PERIODS_PER_DAY - report.total_periods_taught,
+            signed_mask=report.signed_mask,
+        ),
+        workload={str(share.subject_teacher_id): share.taught for share in report.teacher_slots if share.taught},
+    )
+
+
+def encode_frame(event: ReportEvent) -> bytes:
+    data = fastjson.dumps(event.model_dump(mode="json"))
+    return b"event: report\nid: " + event.report.id.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class Subscription:
+    """One stream client's bounded buffer of encoded SSE frames."""
+
+    def __init__(self, buffer_size: int, class_name: Optional[str] = None) -> None:
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=max(buffer_size, 2))
+        self.class_name = class_name
+        self.dropped = 0
+
+    def offer(self, frame: bytes) -> int:
+        """Buffer ``frame``; if the client has fallen behind, discard its backlog and tell it to resync.
+
+        Returns the number of frames discarded. Memory per client is therefore capped at the buffer size, and
+        a slow client costs the publisher nothing but this check.
+        """
+        if not self.queue.full():
+            self.queue.put_nowait(frame)
+            return 0
+        discarded = self.queue.qsize()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC_FRAME)
+        self.queue.put_nowait(frame)
+        self.dropped += discarded
+        return discarded
+
+
+class ReportBroker:
+    """In-process fan-out of report events to stream subscribers."""
+
+    def __init__(self, buffer_size: int, max_subscribers: int, metrics: MetricsRegistry = registry) -> None:
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.metrics = metrics
+        self.subscribers: Set[Subscription] = set()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def check_capacity(self) -> None:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many report stream subscribers, try again later",
+            )
+
+    def subscribe(self, class_name: Optional[str] = None) -> Subscription:
+        self.check_capacity()
+        subscription = Subscription(self.buffer_size, class_name)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def publish(self, reports: Iterable[DailyReport]) -> None:
+        if not self.subscribers:
+            return
+        for report in reports:
+            # Encode once per report, not once per subscriber.
+            frame = encode_frame(report_event(report))
+            self.metrics.inc("report_stream_events_total")
+            for subscription in list(self.subscribers):
+                if subscription.class_name is not None and subscription.class_name != report.class_name:
+                    continue
+                discarded = subscription.offer(frame)
+                if discarded:
+                    self.metrics.inc("report_stream_dropped_total", discarded)
+
+    def start_change_stream(self) -> None:
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self) -> None:
+        """Publish inserts seen on the ``daily_reports`` change stream, so every process sees every report."""
+        resume_after: Any = None
+        while True:
+            try:
+                async with DailyReport.get_motor_collection().watch(
+                    [{"$match": {"operationType": "insert"}}], resume_after=resume_after
+                ) as stream:
+                    async for change in stream:
+                        resume_after = change["_id"]
+                        self.publish([DailyReport.model_validate(change["fullDocument"])])
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - keep watching through failovers and network errors
+                logger.exception("report change stream failed, retrying in %ss", CHANGE_STREAM_RETRY_SECONDS)
+                await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self.subscribers),
+            "buffered": sum(subscription.queue.qsize() for subscription in self.subscribers),
+        }
+
+    async def shutdown(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        self.subscribers.clear()
+
+
+@lru_cache
+def get_report_broker() -> ReportBroker:
+    settings = get_settings()
+    return ReportBroker(
+        buffer_size=settings.report_stream_buffer_size,
+        max_subscribers=settings.report_stream_max_subscribers,
+    )
+
+
+def publish_reports(reports: List[DailyReport]) -> None:
+    """Called after reports are inserted; a no-op when events come from the change stream instead."""
+    if get_settings().report_events_source == "local":
+        get_report_broker().publish(reports)
+
+
+async def stream_frames(
+    broker: ReportBroker,
+    class_name: Optional[str],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    keepalive: float,
+) -> AsyncIterator[bytes]:
+    """SSE frames for reports of ``class_name`` (all when None), with a comment line every ``keepalive`` seconds.
+
+    The subscription is made once the response starts streaming and dropped when it ends, so a response
+    that never starts leaves nothing subscribed.
+    """
+    subscription = broker.subscribe(class_name)
+    try:
+        yield RETRY_FRAME
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield KEEPALIVE_FRAME
+                continue
+            yield frame
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,41 @@
+import asyncio
+
+from pymongo.errors import PyMongoError
+
+from app.config import get_settings
+from app.schemas.health import DatabaseHealth, HealthStatus, PoolHealth, ServerPool
+from app.services import database
+from app.services.metrics import pool_monitor
+
+
+def pool_health() -> PoolHealth:
+    settings = get_settings()
+    servers = pool_monitor.snapshot()
+    checked_out = sum(server.checked_out for server in servers.values())
+    # Each server has its own pool, so utilization is measured against the busiest one.
+    busiest = max((server.checked_out for server in servers.values()), default=0)
+    return PoolHealth(
+        max_pool_size=settings.mongodb_max_pool_size,
+        min_pool_size=settings.mongodb_min_pool_size,
+        open=sum(server.open for server in servers.values()),
+        checked_out=checked_out,
+        utilization=round(busiest / settings.mongodb_max_pool_size, 4) if settings.mongodb_max_pool_size else 0.0,
+        servers={address: ServerPool(open=s.open, checked_out=s.checked_out) for address, s in servers.items()},
+    )
+
+
+async def check_health() -> HealthStatus:
+    settings = get_settings()
+    try:
+        ping_ms = await database.ping(settings.health_ping_timeout_seconds)
+        db = DatabaseHealth(ok=True, ping_ms=round(ping_ms, 3))
+    except asyncio.TimeoutError:
+        db = DatabaseHealth(ok=False, error=f"ping timed out after {settings.health_ping_timeout_seconds:g}s")
+    except PyMongoError as exc:
+        db = DatabaseHealth(ok=False, error=str(exc))
+    return HealthStatus(
+        status="ok" if db.ok else "unavailable",
+        database=db,
+        pool=pool_health(),
+        analytics_read_preference=settings.mongodb_analytics_read_preference,
+    )
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidDocument
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from pymongo.errors import PyMongoError
+
+from app.config import get_settings
+from app.models.job import AnalyticsJob
+from app.models.user import Role
+from app.schemas.auth import TokenPrincipal
+from app.schemas.analytics import AnalyticsJobCreate, AnalyticsJobOut
+from app.schemas.report import DailyReportFilter
+from app.services import analytics
+
+logger = logging.getLogger("app.jobs")
+
+Runner = Callable[[DailyReportFilter, analytics.Engine], Awaitable[List[BaseModel]]]
+
+RUNNERS: Dict[str, Runner] = {
+    "workload": analytics.workload,
+    "missed-periods": analytics.missed_periods,
+    "daily-summary": analytics.daily_summary,
+}
+
+
+class JobQueue:
+    """Runs analytics jobs on a fixed number of asyncio workers and records their state in ``analytics_jobs``.
+
+    The queue itself lives in this process, so a job is executed by the worker that accepted it; its status
+    and result are in MongoDB and can be polled through any worker until ``ttl`` seconds after it finishes.
+    Jobs still waiting or running when the queue shuts down are recorded as failed.
+    """
+
+    def __init__(self, workers: int, max_queued: int, ttl: float) -> None:
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.completed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Slots taken by submissions still inserting their job document; counted against max_queued.
+        self._reserved = 0
+        self._running: Set[PydanticObjectId] = set()
+
+    def _start(self) -> asyncio.Queue:
+        # Created on first use so the queue and its workers belong to the running event loop.
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    def _expires_at(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.ttl)
+
+    async def submit(self, request: AnalyticsJobCreate, user: TokenPrincipal) -> AnalyticsJob:
+        queue = self._start()
+        # The slot is reserved before the insert yields, so concurrent submissions cannot overfill the queue.
+        if queue.qsize() + self._reserved >= self.max_queued:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The analytics job queue is full, try again shortly",
+            )
+        self._reserved += 1
+        try:
+            job = AnalyticsJob(
+                kind=request.kind,
+                engine=request.engine,
+                filters=request.filters.model_dump(mode="json", exclude_none=True),
+                owner_id=user.id,
+            )
+            await job.insert()
+        finally:
+            self._reserved -= 1
+        queue.put_nowait(job.id)
+        return job
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:  # noqa: BLE001 - a broken job must not take the worker down with it
+                logger.exception("analytics job %s could not be recorded", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: PydanticObjectId) -> None:
+        job = await AnalyticsJob.get(job_id)
+        if job is None:
+            return
+        self._running.add(job_id)
+        try:
+            await self._execute(job)
+        finally:
+            self._running.discard(job_id)
+
+    async def _execute(self, job: AnalyticsJob) -> None:
+        await job.set({AnalyticsJob.status: "running", AnalyticsJob.started_at: datetime.utcnow()})
+        try:
+            items = await RUNNERS[job.kind](DailyReportFilter.model_validate(job.filters), job.engine)
+        except Exception as exc:  # noqa: BLE001 - the failure is reported on the job instead
+            error = exc.detail if isinstance(exc, HTTPException) else f"{type(exc).__name__}: {exc}"
+            if not isinstance(exc, HTTPException):
+                logger.exception("analytics job %s failed", job.id)
+            await self._fail(job, str(error))
+            return
+        now = datetime.utcnow()
+        try:
+            await job.set(
+                {
+                    AnalyticsJob.status: "succeeded",
+                    AnalyticsJob.result: [item.model_dump(mode="json") for item in items],
+                    AnalyticsJob.finished_at: now,
+                    AnalyticsJob.expires_at: self._expires_at(now),
+                }
+            )
+        except (InvalidDocument, PyMongoError) as exc:
+            # Typically a result over the 16MB document limit; narrower filters give a smaller one.
+            logger.exception("analytics job %s result could not be stored", job.id)
+            await self._fail(job, f"The result could not be stored ({type(exc).__name__}); narrow the filters")
+            return
+        self.completed += 1
+
+    async def _fail(self, job: AnalyticsJob, error: str) -> None:
+        self.failed += 1
+        now = datetime.utcnow()
+        await job.set(
+            {
+                AnalyticsJob.status: "failed",
+                AnalyticsJob.error: error,
+                AnalyticsJob.finished_at: now,
+                AnalyticsJob.expires_at: self._expires_at(now),
+            }
+        )
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished; used by tests and graceful shutdown."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def shutdown(self) -> None:
+        unfinished = set(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            unfinished.add(self._queue.get_nowait())
+        if unfinished:
+            # Nothing will run these any more; give them an expiry so the TTL monitor removes them.
+            now = datetime.utcnow()
+            await AnalyticsJob.find_many({"_id": {"$in": list(unfinished)}, "finished_at": None}).update_many(
+                {
+                    "$set": {
+                        "status": "failed",
+                        "error": "The server shut down before the job finished",
+                        "finished_at": now,
+                        "expires_at": self._expires_at(now),
+                    }
+                }
+            )
+        self._tasks = []
+        self._running = set()
+        self._queue = None
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        workers=settings.analytics_job_workers,
+        max_queued=settings.analytics_job_queue_size,
+        ttl=settings.analytics_job_ttl_seconds,
+    )
+
+
+async def get_job(job_id: str, user: TokenPrincipal) -> AnalyticsJob:
+    """Load a job for ``user``; other users' jobs are reported as missing unless ``user`` is an admin."""
+    try:
+        oid = PydanticObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    job = await AnalyticsJob.get(oid)
+    if job is None or (job.owner_id != user.id and user.role != Role.admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+def job_out(job: AnalyticsJob) -> AnalyticsJobOut:
+    return AnalyticsJobOut(
+        id=str(job.id),
+        kind=job.kind,
+        engine=job.engine,
+        status=job.status,
+        filters=job.filters,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        result=job.result,
+    )
@@ -0,0 +1,274 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+@dataclass
+class RequestStats:
+    """Timings collected while one HTTP request is being served."""
+
+    phases: Dict[str, float] = field(default_factory=dict)
+    db_commands: int = 0
+    db_documents: int = 0
+    db_seconds: float = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the wall time of the block to the current request's ``name`` phase, if there is a request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_request.get()
+        if stats is not None:
+            stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - started
+
+
+class StartupTimer:
+    """Wall time of each named startup phase of this process, e.g. imports, connecting and index creation."""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def summary(self) -> str:
+        return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+
+
+startup = StartupTimer()
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """A minimal Prometheus-style registry: labelled counters, histograms and callback gauges."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self.gauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+        self.help: Dict[str, str] = {}
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        with self._lock:
+            self.counters[name][tuple(sorted(labels.items()))] += amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self.histograms[name].get(key)
+            if histogram is None:
+                histogram = self.histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name: str, collect: Callable[[], Dict[Labels, float]], help_text: str = "") -> None:
+        self.gauges[name] = collect
+        if help_text:
+            self.help[name] = help_text
+
+    def describe(self, name: str, help_text: str) -> None:
+        self.help[name] = help_text
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> None:
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                header(name, "counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                header(name, "histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, collect in sorted(self.gauges.items()):
+            header(name, "gauge")
+            for labels, value in sorted(collect().items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+registry = MetricsRegistry()
+registry.describe("http_requests_total", "HTTP requests served, by route and status.")
+registry.describe("http_request_duration_seconds", "HTTP request latency, by route.")
+registry.describe("mongo_commands_total", "MongoDB commands issued, by command name.")
+registry.describe("mongo_command_duration_seconds", "MongoDB command latency, by command name.")
+registry.describe("mongo_documents_returned_total", "Documents returned by MongoDB cursors.")
+registry.describe("mongo_pool_checkout_seconds", "Time spent waiting for a pooled MongoDB connection.")
+registry.describe("mongo_pool_checkout_failures_total", "Connection checkouts that failed, by reason.")
+
+
+def _returned_documents(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:  # findAndModify
+        return 1 if reply["value"] is not None else 0
+    return 0
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Pymongo command listener feeding both the global registry and the current request's stats.
+
+    Motor runs pymongo on executor threads with a copy of the caller's context, so ``current_request``
+    still points at the request that issued the command.
+    """
+
+    def __init__(self, metrics: MetricsRegistry = registry) -> None:
+        self.metrics = metrics
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def _record(self, command: str, seconds: float, documents: int) -> None:
+        self.metrics.inc("mongo_commands_total", command=command)
+        self.metrics.observe("mongo_command_duration_seconds", seconds, command=command)
+        if documents:
+            self.metrics.inc("mongo_documents_returned_total", documents, command=command)
+        stats = current_request.get()
+        if stats is not None:
+            stats.db_commands += 1
+            stats.db_documents += documents
+            stats.db_seconds += seconds
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event.command_name, event.duration_micros / 1_000_000, _returned_documents(event.reply))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.metrics.inc("mongo_command_failures_total", command=event.command_name)
+        self._record(event.command_name, event.duration_micros / 1_000_000, 0)
+
+
+@dataclass
+class PoolStats:
+    open: int = 0
+    checked_out: int = 0
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Pymongo pool listener tracking open and checked-out connections per server."""
+
+    def __init__(self, metrics: MetricsRegistry = registry) -> None:
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.servers: Dict[str, PoolStats] = {}
+
+    def _server(self, address: Tuple[str, int]) -> PoolStats:
+        key = f"{address[0]}:{address[1]}"
+        server = self.servers.get(key)
+        if server is None:
+            server = self.servers[key] = PoolStats()
+        return server
+
+    def _adjust(self, address: Tuple[str, int], open: int = 0, checked_out: int = 0) -> None:
+        with self._lock:
+            server = self._server(address)
+            server.open = max(0, server.open + open)
+            server.checked_out = max(0, server.checked_out + checked_out)
+
+    def snapshot(self) -> Dict[str, PoolStats]:
+        with self._lock:
+            return {address: PoolStats(s.open, s.checked_out) for address, s in self.servers.items()}
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        self._adjust(event.address)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        with self._lock:
+            self.servers.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self._adjust(event.address, open=1)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self._adjust(event.address, open=-1)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self.metrics.inc("mongo_pool_checkout_failures_total", reason=str(event.reason))
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self._adjust(event.address, checked_out=1)
+        waited = getattr(event, "duration", None)
+        if waited is not None:
+            self.metrics.observe("mongo_pool_checkout_seconds", waited)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self._adjust(event.address, checked_out=-1)
+
+
+pool_monitor = PoolMonitor()
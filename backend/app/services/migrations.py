@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any, Dict
+
+from app.models.report import DailyReport, PeriodEntry, summarize_periods
+from app.services import assignments, counter, rollup
+
+BACKFILL_BATCH_SIZE = 500
+
+
+async def backfill_period_summaries() -> Dict[str, int]:
+    """Fill signed_mask and teacher_slots on reports written before they existed."""
+    collection = DailyReport.get_motor_collection()
+    cursor = collection.find({"signed_mask": {"$exists": False}}, {"periods": 1}).batch_size(BACKFILL_BATCH_SIZE)
+    updated = 0
+    pending = []
+    async for doc in cursor:
+        signed_mask, teacher_slots = summarize_periods(PeriodEntry(**p) for p in doc["periods"])
+        update = {
+            "signed_mask": signed_mask,
+            "teacher_slots": [share.model_dump() for share in teacher_slots],
+        }
+        pending.append(collection.update_one({"_id": doc["_id"]}, {"$set": update}))
+        if len(pending) >= BACKFILL_BATCH_SIZE:
+            await asyncio.gather(*pending)
+            updated += len(pending)
+            pending = []
+    if pending:
+        await asyncio.gather(*pending)
+        updated += len(pending)
+    if updated:
+        # Coverage filters match on signed_mask, so cached responses may have left these reports out.
+        await counter.increment(counter.REPORTS_VERSION)
+    return {"reports_updated": updated}
+
+
+async def backfill_period_assignments() -> Dict[str, int]:
+    """Build ``period_assignments`` for existing reports once; later runs return without reading them."""
+    if await counter.current(counter.ASSIGNMENTS_BACKFILLED):
+        return {"period_assignments": 0}
+    result = await assignments.rebuild_assignments()
+    await counter.increment(counter.ASSIGNMENTS_BACKFILLED)
+    return result
+
+
+async def run_all() -> Dict[str, Any]:
+    """The idempotent migrations run on deploy, by name; dedupe_reports deletes data and is left to the CLI."""
+    return {
+        "backfill_period_summaries": await backfill_period_summaries(),
+        "backfill_period_assignments": await backfill_period_assignments(),
+    }
+
+
+async def dedupe_reports() -> Dict[str, int]:
+    """Keep only the earliest report per (class_name, date) so the unique index can be built."""
+    collection = DailyReport.get_motor_collection()
+    groups = collection.aggregate(
+        [
+            {"$sort": {"created_at": 1, "_id": 1}},
+            {"$group": {"_id": {"class_name": "$class_name", "date": "$date"}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ],
+        allowDiskUse=True,
+    )
+    duplicates = []
+    async for group in groups:
+        duplicates.extend(group["ids"][1:])
+    removed = 0
+    for start in range(0, len(duplicates), BACKFILL_BATCH_SIZE):
+        result = await collection.delete_many({"_id": {"$in": duplicates[start : start + BACKFILL_BATCH_SIZE]}})
+        removed += result.deleted_count
+    if removed:
+        # Both rebuilds bump REPORTS_VERSION, which also retires responses that counted the removed reports.
+        await rollup.rebuild_rollups()
+        await assignments.rebuild_assignments()
+    return {"reports_removed": removed}
@@ -0,0 +1,64 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from app.models.report import ALL_PERIODS_MASK
+from app.schemas.report import DailyReportFilter
+
+
+def build_query(filters: DailyReportFilter) -> dict:
+    query: dict = {}
+    if filters.class_name:
+        query["class_name"] = filters.class_name
+    if filters.class_teacher_id:
+        query["class_teacher_id"] = filters.class_teacher_id
+    if filters.subject_teacher_id:
+        query["periods.subject_teacher_id"] = filters.subject_teacher_id
+    if filters.start_date and filters.end_date:
+        query["date"] = {"$gte": filters.start_date, "$lte": filters.end_date}
+    elif filters.start_date:
+        query["date"] = {"$gte": filters.start_date}
+    elif filters.end_date:
+        query["date"] = {"$lte": filters.end_date}
+    if filters.missed_period is not None or filters.fully_signed is not None:
+        masks = signed_mask_values(filters.missed_period, filters.fully_signed)
+        query["signed_mask"] = masks[0] if len(masks) == 1 else {"$in": masks}
+    return query
+
+
+def signed_mask_values(missed_period: Optional[int], fully_signed: Optional[bool]) -> List[int]:
+    """Every signed_mask value matching the coverage filters.
+
+    With only 256 possible masks an explicit $in list gives the (signed_mask, date) index exact bounds,
+    which $bitsAllClear / $bitsAnyClear cannot.
+    """
+    values = range(ALL_PERIODS_MASK + 1)
+    if missed_period is not None:
+        values = [v for v in values if not v & (1 << (missed_period - 1))]
+    if fully_signed is True:
+        values = [v for v in values if v == ALL_PERIODS_MASK]
+    elif fully_signed is False:
+        values = [v for v in values if v != ALL_PERIODS_MASK]
+    return list(values)
+
+
+def teacher_slots_stage() -> Dict[str, Any]:
+    """``$addFields`` stage giving reports stored before ``teacher_slots`` existed one share per period.
+
+    Per-period shares group to the same per-teacher totals, so later stages need not tell the two apart.
+    """
+    per_period = {
+        "$map": {
+            "input": "$periods",
+            "as": "period",
+            "in": {
+                "subject_teacher_id": "$$period.subject_teacher_id",
+                "periods": 1,
+                "taught": {"$cond": ["$$period.signed", 1, 0]},
+            },
+        }
+    }
+    return {"$addFields": {"teacher_slots": {"$ifNull": ["$teacher_slots", per_period]}}}
+
+
+def as_date(value: date | datetime) -> date:
+    return value.date() if isinstance(value, datetime) else value
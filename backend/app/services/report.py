@@ -1,15 +1,52 @@
-from datetime import date
-from typing import List, Optional
+import asyncio
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 
 from beanie import PydanticObjectId
+from beanie.odm.utils.encoder import Encoder
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from app.models.report import DailyReport, PeriodEntry
 from app.models.user import Role, User
-from app.schemas.report import DailyReportCreate, DailyReportFilter
+from app.schemas.report import BulkReportResult, DailyReportCreate, DailyReportFilter
+from app.services import assignments, counter, events, fastjson, rollup
+from app.services.database import DUPLICATE_KEY
+from app.services.query import as_date, build_query
+from app.services.validation import validation_message
 
+REPORT_FIELDS = ("date", "class_name", "class_teacher_id", "periods", "total_periods_taught", "created_at")
 
-async def create_report(data: DailyReportCreate, current_user: User) -> DailyReport:
+REPORT_EXPORT_COLUMNS = ("report_id", "date", "class_name", "class_teacher_id", "total_periods_taught", "created_at")
+PERIOD_EXPORT_COLUMNS = (
+    "report_id",
+    "date",
+    "class_name",
+    "class_teacher_id",
+    "period_number",
+    "subject",
+    "topic",
+    "subject_teacher_id",
+    "signed",
+    "remarks",
+)
+
+# Set on a report until its rollups, period assignments and version bump are written. The request that writes
+# them clears it first, so concurrent retries do not both write, and sets it again if a write fails; a retry
+# that finds it set writes them again. Every one of those writes can safely be repeated.
+EFFECTS_PENDING = "effects_pending"
+
+ExportFormat = Literal["ndjson", "csv"]
+ExportRows = Literal["report", "period"]
+
+
+def build_report(data: DailyReportCreate, current_user: User) -> DailyReport:
     periods = [PeriodEntry(**p.model_dump()) for p in data.periods]
 
     for period in periods:
@@ -21,15 +58,156 @@ async def create_report(data: DailyReportCreate, current_user: User) -> DailyRep
 
     total_signed = sum(1 for p in periods if p.signed)
 
-    report = DailyReport(
+    return DailyReport(
         date=data.date,
         class_name=data.class_name,
         class_teacher_id=data.class_teacher_id,
         periods=periods,
         total_periods_taught=total_signed,
     )
-    await report.insert()
-    return report
+
+
+async def create_report(
+    data: DailyReportCreate, current_user: User, idempotency_key: Optional[str] = None
+) -> DailyReport:
+    """Insert the report unless one already exists for its class and date.
+
+    The upsert matches on the Idempotency-Key when one is sent, otherwise on class and date, and only writes
+    on insert, so a retried submission whose side effects are done costs one round-trip and changes nothing.
+    A different submission for an existing class/date is rejected with 409, and an Idempotency-Key that
+    was already used for a different submission with 422.
+    """
+    report = build_report(data, current_user)
+    report.id = PydanticObjectId()
+    report.idempotency_key = idempotency_key
+    collection = DailyReport.get_motor_collection()
+    day = {"class_name": report.class_name, "date": datetime.combine(report.date, time.min)}
+    try:
+        doc = await collection.find_one_and_update(
+            {"idempotency_key": idempotency_key} if idempotency_key is not None else day,
+            {"$setOnInsert": {**Encoder(to_db=True).encode(report), EFFECTS_PENDING: True}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # A new Idempotency-Key for a class/date that already has a report, or a concurrent first submission.
+        doc = await collection.find_one(day)
+    stored = report if doc["_id"] == report.id else DailyReport.model_validate(doc)
+    if stored is not report:
+        if (stored.class_name, stored.date) != (report.class_name, report.date):
+            raise _idempotency_key_reused()
+        if not _same_submission(stored, report):
+            if idempotency_key is not None and stored.idempotency_key == idempotency_key:
+                raise _idempotency_key_reused()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A report for {report.class_name} on {report.date.isoformat()} already exists",
+            )
+    if doc.get(EFFECTS_PENDING) is True:
+        await _apply_effects(await _claim_effects([stored]))
+    return stored
+
+
+async def _claim_effects(reports: List[DailyReport]) -> List[DailyReport]:
+    """Clear ``EFFECTS_PENDING`` on ``reports`` and return the ones whose flag this call cleared.
+
+    Concurrent retries can all see the flag set, but only one of them clears it, so only that one writes.
+    """
+    collection = DailyReport.get_motor_collection()
+    claimed = await asyncio.gather(
+        *(
+            collection.find_one_and_update(
+                {"_id": report.id, EFFECTS_PENDING: True}, {"$unset": {EFFECTS_PENDING: ""}}, projection={"_id": 1}
+            )
+            for report in reports
+        )
+    )
+    return [report for report, doc in zip(reports, claimed) if doc is not None]
+
+
+async def _apply_effects(reports: List[DailyReport]) -> None:
+    if not reports:
+        return
+    try:
+        await rollup.add_reports(reports)
+        await assignments.add_reports(reports)
+        await counter.increment(counter.REPORTS_VERSION)
+    except BaseException:
+        # Hand the effects back to the next retry.
+        await DailyReport.get_motor_collection().update_many(
+            {"_id": {"$in": [report.id for report in reports]}}, {"$set": {EFFECTS_PENDING: True}}
+        )
+        raise
+    events.publish_reports(reports)
+
+
+def _idempotency_key_reused() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        detail="This Idempotency-Key was already used for a different report",
+    )
+
+
+def _same_submission(existing: DailyReport, report: DailyReport) -> bool:
+    return existing.class_teacher_id == report.class_teacher_id and existing.periods == report.periods
+
+
+async def create_reports_bulk(items: List[Dict[str, Any]], current_user: User) -> List[BulkReportResult]:
+    """Validate and authorize every item, then insert the valid ones with one unordered ``insert_many``.
+
+    Inserted reports carry ``EFFECTS_PENDING`` like single submissions. Resubmitting an item whose report
+    exists but still has the flag set writes the missing side effects, although the item is still reported
+    as a duplicate.
+    """
+    results: List[BulkReportResult] = []
+    pending: List[Tuple[int, DailyReport]] = []
+    for index, item in enumerate(items):
+        try:
+            report = build_report(DailyReportCreate.model_validate(item), current_user)
+        except ValidationError as exc:
+            results.append(BulkReportResult(index=index, ok=False, error=validation_message(exc)))
+            continue
+        except HTTPException as exc:
+            results.append(BulkReportResult(index=index, ok=False, error=exc.detail))
+            continue
+        report.id = PydanticObjectId()
+        pending.append((index, report))
+
+    failed: Dict[int, str] = {}
+    duplicates: List[Dict[str, Any]] = []
+    collection = DailyReport.get_motor_collection()
+    if pending:
+        try:
+            await collection.insert_many(
+                [{**Encoder(to_db=True).encode(report), EFFECTS_PENDING: True} for _, report in pending],
+                ordered=False,
+            )
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY:
+                    report = pending[error["index"]][1]
+                    failed[error["index"]] = (
+                        f"A report for {report.class_name} on {report.date.isoformat()} already exists"
+                    )
+                    duplicates.append(
+                        {"class_name": report.class_name, "date": datetime.combine(report.date, time.min)}
+                    )
+                else:
+                    failed[error["index"]] = error.get("errmsg", "Write failed")
+
+    inserted = [report for position, (_, report) in enumerate(pending) if position not in failed]
+    if duplicates:
+        interrupted = await collection.find({"$or": duplicates, EFFECTS_PENDING: True}).to_list(length=None)
+        inserted += [DailyReport.model_validate(doc) for doc in interrupted]
+    if inserted:
+        await _apply_effects(await _claim_effects(inserted))
+    for position, (index, report) in enumerate(pending):
+        if position in failed:
+            results.append(BulkReportResult(index=index, ok=False, error=failed[position]))
+        else:
+            results.append(BulkReportResult(index=index, ok=True, id=str(report.id)))
+    results.sort(key=lambda r: r.index)
+    return results
 
 
 async def get_report(report_id: str) -> DailyReport:
@@ -40,19 +218,156 @@ async def get_report(report_id: str) -> DailyReport:
 
 
 async def list_reports(filters: DailyReportFilter) -> List[DailyReport]:
-    query = {}
-    if filters.class_name:
-        query["class_name"] = filters.class_name
-    if filters.class_teacher_id:
-        query["class_teacher_id"] = filters.class_teacher_id
-    if filters.subject_teacher_id:
-        query["periods.subject_teacher_id"] = filters.subject_teacher_id
-    if filters.start_date and filters.end_date:
-        query["date"] = {"$gte": filters.start_date, "$lte": filters.end_date}
-    elif filters.start_date:
-        query["date"] = {"$gte": filters.start_date}
-    elif filters.end_date:
-        query["date"] = {"$lte": filters.end_date}
-
-    reports = await DailyReport.find_many(query).to_list()
+    reports = await DailyReport.find_many(build_query(filters)).to_list()
     return reports
+
+
+def _period_json(period: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "period_number": period["period_number"],
+        "subject": period["subject"],
+        "topic": period["topic"],
+        "subject_teacher_id": str(period["subject_teacher_id"]),
+        "signed": period.get("signed", False),
+        "remarks": period.get("remarks"),
+    }
+
+
+def report_json(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Convert a raw report document to the DailyReportListItem JSON shape without building models."""
+    item: Dict[str, Any] = {"id": str(doc["_id"])}
+    for name in fields or REPORT_FIELDS:
+        if name not in doc:
+            continue
+        value = doc[name]
+        if name == "date":
+            value = as_date(value).isoformat()
+        elif name == "created_at":
+            value = value.isoformat()
+        elif name == "class_teacher_id":
+            value = str(value)
+        elif name == "periods":
+            value = [_period_json(period) for period in value]
+        item[name] = value
+    return item
+
+
+def encode_report_page(docs: List[Dict[str, Any]], next_cursor: Optional[str], fields: Optional[List[str]] = None) -> bytes:
+    return fastjson.dumps({"items": [report_json(doc, fields) for doc in docs], "next_cursor": next_cursor})
+
+
+def encode_cursor(report_date: date, report_id: PydanticObjectId) -> str:
+    raw = json.dumps([report_date.isoformat(), str(report_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, PydanticObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        report_date, report_id = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(report_date), PydanticObjectId(report_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in REPORT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown report fields: {', '.join(unknown)}",
+        )
+    return requested
+
+
+async def list_reports_page(
+    filters: DailyReportFilter,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return one page of raw report documents ordered by (date, _id) and the cursor of the next page."""
+    query = build_query(filters)
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        keyset = {"$or": [{"date": {"$gt": after_date}}, {"date": after_date, "_id": {"$gt": after_id}}]}
+        query = {"$and": [query, keyset]} if query else keyset
+
+    # date is always projected because the cursor is built from it.
+    projection = {name: 1 for name in (fields or REPORT_FIELDS)}
+    projection["date"] = 1
+
+    docs = (
+        await DailyReport.get_motor_collection()
+        .find(Encoder().encode(query), projection)
+        .sort([("date", 1), ("_id", 1)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(as_date(last["date"]), last["_id"])
+    return docs, next_cursor
+
+
+def _export_rows(doc: Dict[str, Any], rows: ExportRows) -> List[Dict[str, Any]]:
+    base = {
+        "report_id": str(doc["_id"]),
+        "date": as_date(doc["date"]).isoformat(),
+        "class_name": doc["class_name"],
+        "class_teacher_id": str(doc["class_teacher_id"]),
+    }
+    if rows == "report":
+        base["total_periods_taught"] = doc.get("total_periods_taught", 0)
+        created_at = doc.get("created_at")
+        base["created_at"] = created_at.isoformat() if created_at else None
+        return [base]
+    return [
+        {**base, **_period_json(period)}
+        for period in sorted(doc.get("periods", []), key=lambda p: p["period_number"])
+    ]
+
+
+def _encode_chunk(rows: List[Dict[str, Any]], fmt: ExportFormat, columns: Tuple[str, ...]) -> str:
+    if fmt == "ndjson":
+        return b"\n".join(fastjson.dumps(row) for row in rows).decode() + "\n"
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def export_reports(
+    filters: DailyReportFilter,
+    fmt: ExportFormat = "ndjson",
+    rows: ExportRows = "report",
+    batch_size: int = 1000,
+) -> AsyncIterator[str]:
+    """Stream reports matching ``filters`` as NDJSON or CSV text, one cursor batch per chunk."""
+    columns = REPORT_EXPORT_COLUMNS if rows == "report" else PERIOD_EXPORT_COLUMNS
+    projection = {name: 1 for name in REPORT_FIELDS}
+    if rows == "report":
+        projection.pop("periods")
+
+    if fmt == "csv":
+        yield ",".join(columns) + "\n"
+
+    cursor = (
+        DailyReport.get_motor_collection()
+        .find(Encoder().encode(build_query(filters)), projection)
+        .sort([("date", 1), ("_id", 1)])
+        .batch_size(batch_size)
+    )
+    pending: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        pending.extend(_export_rows(doc, rows))
+        if len(pending) >= batch_size:
+            yield _encode_chunk(pending, fmt, columns)
+            pending = []
+    if pending:
+        yield _encode_chunk(pending, fmt, columns)
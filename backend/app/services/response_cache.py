@@ -0,0 +1,63 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple, Tuple, Union
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from app.models.user import User
+from app.schemas.auth import TokenPrincipal
+from app.services import counter
+from app.services.cache import get_response_cache
+from app.services.metrics import phase
+
+
+class CachedBody(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+async def cached_json(
+    request: Request,
+    current_user: Union[User, TokenPrincipal],
+    key: Tuple[Hashable, ...],
+    compute: Callable[[], Awaitable[Union[BaseModel, bytes]]],
+    **dump_kwargs: Any,
+) -> Response:
+    """Serve ``compute()`` (a model, or JSON bytes already encoded) with a strong ETag, reusing the body until a report write bumps the version.
+
+    Entries are keyed on (route, key, role, reports version), so any report write makes every older entry
+    unreachable and it simply ages out of the LRU.
+    """
+    version = await counter.current(counter.REPORTS_VERSION)
+    cache_key = (request.url.path, key, current_user.role.value, version)
+    cache = get_response_cache()
+    cached = cache.get(cache_key)
+    if cached is None:
+        token = counter.known_reports_version.set(version)
+        try:
+            with phase("query"):
+                model = await compute()
+        finally:
+            counter.known_reports_version.reset(token)
+        with phase("serialize"):
+            body = model if isinstance(model, bytes) else model.model_dump_json(**dump_kwargs).encode()
+        cached = CachedBody(etag=make_etag(body), body=body)
+        cache.set(cache_key, cached)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
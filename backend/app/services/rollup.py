@@ -0,0 +1,200 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from beanie.odm.utils.encoder import Encoder
+
+from app.models.report import PERIODS_PER_DAY, DailyReport
+from app.models.rollup import ClassDayRollup, TeacherDayRollup
+from app.schemas.report import DailyReportFilter
+from app.services import counter
+from app.services.database import analytics_collection
+from app.services.query import build_query, teacher_slots_stage
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def rollup_query(filters: DailyReportFilter) -> dict:
+    """Translate ``filters`` to a rollup query; rollups carry class_name, class_teacher_id and date."""
+    return Encoder().encode(build_query(filters.model_copy(update={"subject_teacher_id": None})))
+
+
+RollupUpdate = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+def _rollup_updates(reports: Iterable[DailyReport], direction: int) -> Tuple[List[RollupUpdate], List[RollupUpdate]]:
+    """Row updates adding (``direction`` 1) or removing (-1) ``reports``.
+
+    A class files at most one report a day, so every rollup row belongs to a single report. The updates set
+    the row's values instead of incrementing them: a submission retried while its report is still marked
+    ``EFFECTS_PENDING`` applies them again, and ``$inc`` would count that report twice.
+    """
+    class_ops: List[RollupUpdate] = []
+    written_at = datetime.utcnow()
+    teacher_counts: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+    for report in reports:
+        report_date = datetime.combine(report.date, time.min)
+        missed = PERIODS_PER_DAY - report.total_periods_taught
+        key = {"class_name": report.class_name, "class_teacher_id": report.class_teacher_id, "date": report_date}
+        if direction > 0:
+            values = {"reports": 1, "signed": report.total_periods_taught, "missed": missed, "report_id": report.id}
+        else:
+            values = {"reports": 0, "signed": 0, "missed": 0, "report_id": None}
+        class_ops.append((key, {"$set": {**values, "written_at": written_at}}))
+        for share in report.teacher_slots:
+            counts = teacher_counts[(share.subject_teacher_id, report.class_name, report.class_teacher_id, report_date)]
+            if direction > 0:
+                counts[0] += share.taught
+                counts[1] += share.periods - share.taught
+
+    teacher_ops = [
+        (
+            {
+                "subject_teacher_id": teacher_id,
+                "class_name": class_name,
+                "class_teacher_id": class_teacher_id,
+                "date": report_date,
+            },
+            {"$set": {"signed": signed, "missed": missed, "written_at": written_at}},
+        )
+        for (teacher_id, class_name, class_teacher_id, report_date), (signed, missed) in teacher_counts.items()
+    ]
+    return class_ops, teacher_ops
+
+
+async def _apply(reports: List[DailyReport], direction: int) -> None:
+    if not reports:
+        return
+    class_ops, teacher_ops = _rollup_updates(reports, direction)
+    class_rollups = ClassDayRollup.get_motor_collection()
+    teacher_rollups = TeacherDayRollup.get_motor_collection()
+    # Only additions may create rollup rows; removals touch rows that must already exist.
+    upsert = direction > 0
+    await asyncio.gather(
+        *(class_rollups.update_one(key, update, upsert=upsert) for key, update in class_ops),
+        *(teacher_rollups.update_one(key, update, upsert=upsert) for key, update in teacher_ops),
+    )
+
+
+async def add_reports(reports: List[DailyReport]) -> None:
+    await _apply(reports, 1)
+
+
+async def remove_reports(reports: List[DailyReport]) -> None:
+    await _apply(reports, -1)
+
+
+async def rebuild_rollups() -> Dict[str, int]:
+    """Recompute both rollup collections from ``daily_reports``.
+
+    Rows are replaced in place, and rows that no report produces any more are deleted at the end, so
+    analytics keep reading the old rows while this runs. A report submitted meanwhile keeps its rows, but a
+    row the rebuild has already read may be replaced with its older values; run it while submission is quiet.
+    """
+    started = datetime.utcnow()
+    reports = DailyReport.get_motor_collection()
+    class_rows = reports.aggregate(
+        [
+            {
+                "$group": {
+                    "_id": {"class_name": "$class_name", "class_teacher_id": "$class_teacher_id", "date": "$date"},
+                    "reports": {"$sum": 1},
+                    "signed": {"$sum": "$total_periods_taught"},
+                    "missed": {"$sum": {"$subtract": [PERIODS_PER_DAY, "$total_periods_taught"]}},
+                    # The unique (class_name, date) index leaves one report per row.
+                    "report_id": {"$max": "$_id"},
+                }
+            }
+        ]
+    )
+    teacher_rows = reports.aggregate(
+        [
+            teacher_slots_stage(),
+            {"$unwind": "$teacher_slots"},
+            {
+                "$group": {
+                    "_id": {
+                        "subject_teacher_id": "$teacher_slots.subject_teacher_id",
+                        "class_name": "$class_name",
+                        "class_teacher_id": "$class_teacher_id",
+                        "date": "$date",
+                    },
+                    "signed": {"$sum": "$teacher_slots.taught"},
+                    "missed": {"$sum": {"$subtract": ["$teacher_slots.periods", "$teacher_slots.taught"]}},
+                }
+            },
+        ]
+    )
+    result = {
+        "class_day_rollups": await _replace_rows(class_rows, ClassDayRollup, started),
+        "teacher_day_rollups": await _replace_rows(teacher_rows, TeacherDayRollup, started),
+    }
+    # Cached analytics responses were computed from the old rows.
+    await counter.increment(counter.REPORTS_VERSION)
+    return result
+
+
+async def _replace_rows(rows: Any, model: type, started: datetime) -> int:
+    """Upsert every row stamped with ``started``, then delete the rows written before it."""
+    collection = model.get_motor_collection()
+    written = 0
+    batch: List[Any] = []
+    async for row in rows:
+        key = row.pop("_id")
+        batch.append(collection.replace_one(key, {**key, **row, "written_at": started}, upsert=True))
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            await asyncio.gather(*batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        await asyncio.gather(*batch)
+        written += len(batch)
+    # Rows written by report submissions during the rebuild are newer than ``started`` and stay.
+    await collection.delete_many({"$or": [{"written_at": {"$lt": started}}, {"written_at": {"$exists": False}}]})
+    return written
+
+
+async def workload_rows(filters: DailyReportFilter) -> List[Dict[str, Any]]:
+    return await analytics_collection(TeacherDayRollup).aggregate(
+        [
+            {"$match": rollup_query(filters)},
+            {"$group": {"_id": "$subject_teacher_id", "periods_taught": {"$sum": "$signed"}}},
+            {"$match": {"periods_taught": {"$gt": 0}}},
+            {"$sort": {"_id": 1}},
+        ]
+    ).to_list(length=None)
+
+
+async def missed_rows(filters: DailyReportFilter) -> List[Dict[str, Any]]:
+    return await analytics_collection(ClassDayRollup).aggregate(
+        [
+            {"$match": rollup_query(filters)},
+            {"$sort": {"date": 1, "class_name": 1}},
+            {"$match": {"reports": {"$gt": 0}}},
+            {
+                "$project": {
+                    "_id": "$report_id",
+                    "class_name": 1,
+                    "date": 1,
+                    "missed": 1,
+                }
+            },
+        ]
+    ).to_list(length=None)
+
+
+async def class_timeseries_rows(filters: DailyReportFilter, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return await analytics_collection(ClassDayRollup).aggregate(
+        [{"$match": rollup_query(filters)}, *pipeline]
+    ).to_list(length=None)
+
+
+async def teacher_timeseries_rows(filters: DailyReportFilter, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Teacher rollups are keyed by subject teacher, so that filter applies directly here.
+    query = rollup_query(filters)
+    if filters.subject_teacher_id:
+        query["subject_teacher_id"] = filters.subject_teacher_id
+    return await analytics_collection(TeacherDayRollup).aggregate([{"$match": query}, *pipeline]).to_list(
+        length=None
+    )
@@ -0,0 +1,127 @@
+import asyncio
+import csv
+import io
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.config import get_settings
+from app.models.user import User
+from app.schemas.auth import BulkUserCreate, BulkUserResult
+from app.services.auth import PasswordHasher
+from app.services.counter import DISPLAY_ID_SEQUENCE, BlockAllocator
+from app.services.database import DUPLICATE_KEY
+from app.services.validation import validation_message
+
+DISPLAY_ID_PREFIX = "T"
+CSV_COLUMNS = ("name", "email", "password")
+
+
+def format_display_id(value: int, prefix: str = DISPLAY_ID_PREFIX) -> str:
+    # Seven digits, so sequence ids never collide with the six-character random ids issued before.
+    return f"{prefix}-{value:07d}"
+
+
+@lru_cache
+def get_display_id_allocator() -> BlockAllocator:
+    return BlockAllocator(DISPLAY_ID_SEQUENCE, get_settings().display_id_block_size)
+
+
+async def allocate_display_ids(count: int = 1) -> List[str]:
+    """Allocate ``count`` display ids; usually no round-trip, and one ``$inc`` whenever a block runs out."""
+    return [format_display_id(value) for value in await get_display_id_allocator().take(count)]
+
+
+def parse_users_csv(content: bytes) -> List[Dict[str, Any]]:
+    """Rows of a ``name,email,password[,role]`` CSV as dicts; blank cells are left out so defaults apply."""
+    try:
+        reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+        fieldnames = reader.fieldnames or []
+        missing = [column for column in CSV_COLUMNS if column not in fieldnames]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The CSV file is missing columns: {', '.join(missing)}",
+            )
+        return [{key: value.strip() for key, value in row.items() if key and value and value.strip()} for row in reader]
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The CSV file must be UTF-8 encoded")
+    except csv.Error as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"The CSV file could not be parsed: {exc}"
+        )
+
+
+async def create_users_bulk(items: List[Dict[str, Any]], hasher: PasswordHasher) -> List[BulkUserResult]:
+    """Create many users with one ``$in`` email check, parallel hashing, one id allocation and one ``insert_many``."""
+    results: List[BulkUserResult] = []
+    valid: List[Tuple[int, BulkUserCreate]] = []
+    seen: set = set()
+    for index, item in enumerate(items):
+        try:
+            data = BulkUserCreate.model_validate(item)
+        except ValidationError as exc:
+            # Echo the email only if it is a string; BulkUserResult would reject anything else.
+            email = item.get("email") if isinstance(item.get("email"), str) else None
+            results.append(BulkUserResult(index=index, ok=False, email=email, error=validation_message(exc)))
+            continue
+        if data.email in seen:
+            results.append(
+                BulkUserResult(index=index, ok=False, email=data.email, error="Duplicate email in this batch")
+            )
+            continue
+        seen.add(data.email)
+        valid.append((index, data))
+
+    existing: set = set()
+    if valid:
+        existing = {
+            doc["email"]
+            for doc in await User.get_motor_collection()
+            .find({"email": {"$in": [data.email for _, data in valid]}}, {"email": 1})
+            .to_list(length=None)
+        }
+    pending: List[Tuple[int, BulkUserCreate]] = []
+    for index, data in valid:
+        if data.email in existing:
+            results.append(BulkUserResult(index=index, ok=False, email=data.email, error="User already exists"))
+        else:
+            pending.append((index, data))
+
+    if pending:
+        # The hasher bounds how many of these run at once; the rest wait on its semaphore.
+        hashes = await asyncio.gather(*(hasher.hash(data.password) for _, data in pending))
+        display_ids = await allocate_display_ids(len(pending))
+        users = [
+            User(
+                id=PydanticObjectId(),
+                name=data.name,
+                email=data.email,
+                hashed_password=hashed,
+                role=data.role,
+                display_id=display_id,
+            )
+            for (_, data), hashed, display_id in zip(pending, hashes, display_ids)
+        ]
+        failed: Dict[int, str] = {}
+        try:
+            await User.insert_many(users, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                # A concurrent signup can take an email between the $in check and the insert.
+                failed[error["index"]] = (
+                    "User already exists" if error.get("code") == DUPLICATE_KEY else error.get("errmsg", "Write failed")
+                )
+        for position, ((index, data), user) in enumerate(zip(pending, users)):
+            if position in failed:
+                results.append(BulkUserResult(index=index, ok=False, email=data.email, error=failed[position]))
+            else:
+                results.append(
+                    BulkUserResult(index=index, ok=True, id=str(user.id), email=user.email, display_id=user.display_id)
+                )
+    results.sort(key=lambda r: r.index)
+    return results
@@ -0,0 +1,9 @@
+from pydantic import ValidationError
+
+
+def validation_message(exc: ValidationError) -> str:
+    """One line per error, ``loc: msg``, for per-item results of bulk endpoints."""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
@@ -0,0 +1,281 @@
+"""Latency and throughput benchmark for the Teacher AMS API.
+
+Seeds a synthetic school, then drives every main endpoint through the ASGI transport and writes
+p50/p95/p99 latency and throughput as JSON so runs can be diffed across commits::
+
+    cd backend
+    python -m benchmarks.api_bench --classes 12 --teachers 30 --months 3 --output bench.json
+
+By default the data lives in mongomock; pass ``--mongodb-uri`` to benchmark a real server.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from beanie import PydanticObjectId, init_beanie
+from httpx import ASGITransport, AsyncClient
+
+from app.config import Settings
+from app.main import DOCUMENT_MODELS, create_app, create_motor_client
+from app.models.report import DailyReport, PeriodEntry
+from app.models.user import Role, User
+from app.services import rollup
+from app.services.auth import get_password_hash
+from app.services.cache import get_response_cache
+
+PASSWORD = "benchmark-password"
+SUBJECTS = ["Math", "Science", "English", "History", "Geography", "Art", "Music", "PE"]
+
+
+@dataclass
+class School:
+    admin_email: str
+    teacher_ids: List[PydanticObjectId]
+    class_names: List[str]
+    start_date: date
+    end_date: date
+    reports: int = 0
+
+
+@dataclass
+class ScenarioResult:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "p50_ms": percentile(ordered, 50),
+            "p95_ms": percentile(ordered, 95),
+            "p99_ms": percentile(ordered, 99),
+            "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else None,
+            "throughput_rps": round(len(ordered) / self.elapsed, 2) if self.elapsed else None,
+        }
+
+
+def percentile(ordered: List[float], pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return round(ordered[rank - 1], 3)
+
+
+def school_days(start: date, months: int) -> List[date]:
+    end = start + timedelta(days=30 * months)
+    days = []
+    current = start
+    while current < end:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+async def seed_school(classes: int, teachers: int, months: int, seed: int) -> School:
+    rng = random.Random(seed)
+    hashed = get_password_hash(PASSWORD)
+    admin = User(name="Bench Admin", email="admin@bench.example.com", hashed_password=hashed, role=Role.admin)
+    await admin.insert()
+    staff = [
+        User(name=f"Teacher {i}", email=f"teacher{i}@bench.example.com", hashed_password=hashed, display_id=f"T-B{i:05d}")
+        for i in range(teachers)
+    ]
+    await User.insert_many(staff)
+    inserted = await User.find_many({"role": Role.teacher.value}).to_list()
+    teacher_ids = [user.id for user in inserted]
+
+    class_names = [f"Grade {6 + i // 4}-{'ABCD'[i % 4]}" for i in range(classes)]
+    days = school_days(date(2024, 9, 2), months)
+    batch: List[DailyReport] = []
+    total = 0
+    for day in days:
+        for c, class_name in enumerate(class_names):
+            periods = [
+                PeriodEntry(
+                    period_number=p,
+                    subject=SUBJECTS[(p + c) % len(SUBJECTS)],
+                    topic=f"Unit {day.isocalendar()[1]}",
+                    subject_teacher_id=teacher_ids[(c * 3 + p) % len(teacher_ids)],
+                    signed=rng.random() < 0.9,
+                )
+                for p in range(1, 9)
+            ]
+            batch.append(
+                DailyReport(
+                    date=day,
+                    class_name=class_name,
+                    class_teacher_id=teacher_ids[c % len(teacher_ids)],
+                    periods=periods,
+                    total_periods_taught=sum(1 for p in periods if p.signed),
+                )
+            )
+            if len(batch) >= 1000:
+                await DailyReport.insert_many(batch)
+                total += len(batch)
+                batch = []
+    if batch:
+        await DailyReport.insert_many(batch)
+        total += len(batch)
+    await rollup.rebuild_rollups()
+    return School(admin.email, teacher_ids, class_names, days[0], days[-1], total)
+
+
+async def run_scenario(
+    requests: int, concurrency: int, send: Callable[[int], Awaitable[Any]], cold: bool = False
+) -> ScenarioResult:
+    result = ScenarioResult()
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if cold:
+                get_response_cache().clear()
+            started = time.perf_counter()
+            response = await send(i)
+            result.latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def report_payload(school: School, i: int) -> Dict[str, Any]:
+    return {
+        "date": (school.end_date + timedelta(days=1 + i)).isoformat(),
+        "class_name": f"Bench-{i}",
+        "class_teacher_id": str(school.teacher_ids[0]),
+        "periods": [
+            {
+                "period_number": p,
+                "subject": SUBJECTS[p - 1],
+                "topic": "Benchmark",
+                "subject_teacher_id": str(school.teacher_ids[p % len(school.teacher_ids)]),
+                "signed": True,
+            }
+            for p in range(1, 9)
+        ],
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    settings = Settings(mongodb_uri=args.mongodb_uri or "mongodb://localhost:27017", mongodb_db=args.db)
+    if args.mongodb_uri:
+        motor_client = create_motor_client(settings)
+        await motor_client.drop_database(args.db)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        motor_client = AsyncMongoMockClient()
+    await init_beanie(database=motor_client[args.db], document_models=DOCUMENT_MODELS)
+
+    seed_started = time.perf_counter()
+    school = await seed_school(args.classes, args.teachers, args.months, args.seed)
+    seed_seconds = time.perf_counter() - seed_started
+
+    app = create_app(settings=settings, motor_client=motor_client)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        login = await client.post("/auth/login", json={"email": school.admin_email, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        window = {"start_date": school.start_date.isoformat(), "end_date": school.end_date.isoformat()}
+
+        scenarios: Dict[str, Callable[[int], Awaitable[Any]]] = {
+            "auth_login": lambda i: client.post(
+                "/auth/login", json={"email": school.admin_email, "password": PASSWORD}
+            ),
+            "reports_create": lambda i: client.post("/reports", json=report_payload(school, i), headers=headers),
+            "reports_list": lambda i: client.get("/reports", params={"limit": 50}, headers=headers),
+            "analytics_workload": lambda i: client.get("/analytics/workload", params=window, headers=headers),
+            "analytics_missed_periods": lambda i: client.get(
+                "/analytics/missed-periods", params=window, headers=headers
+            ),
+            "analytics_daily_summary": lambda i: client.get(
+                "/analytics/daily-summary", params=window, headers=headers
+            ),
+        }
+        selected = args.scenario or list(scenarios)
+        results = {}
+        for name in selected:
+            outcome = await run_scenario(args.requests, args.concurrency, scenarios[name], cold=args.cold)
+            results[name] = outcome.summary()
+
+    if args.mongodb_uri:
+        await motor_client.drop_database(args.db)
+        motor_client.close()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "backend": "mongodb" if args.mongodb_uri else "mongomock",
+            "classes": args.classes,
+            "teachers": args.teachers,
+            "months": args.months,
+            "reports": school.reports,
+            "seed_seconds": round(seed_seconds, 3),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cold": args.cold,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.api_bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--classes", type=int, default=12)
+    parser.add_argument("--teachers", type=int, default=30)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cold", action="store_true", help="clear the response cache before every request")
+    parser.add_argument("--scenario", action="append", help="run only this scenario (repeatable)")
+    parser.add_argument("--mongodb-uri", help="benchmark against a real MongoDB instead of mongomock")
+    parser.add_argument("--db", default="teacher_ams_bench")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    results = asyncio.run(run_benchmark(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,12 @@ from httpx import ASGITransport, AsyncClient
 from mongomock_motor import AsyncMongoMockClient
 
 from app.config import Settings
-from app.main import create_app
-from app.models.report import DailyReport
-from app.models.user import User
+from app.main import DOCUMENT_MODELS, create_app
+from app.services.auth import get_token_revocations
+from app.services.cache import get_response_cache, get_token_cache, get_user_cache
+from app.services.events import get_report_broker
+from app.services.jobs import get_job_queue
+from app.services.users import get_display_id_allocator
 
 
 @pytest_asyncio.fixture
@@ -16,12 +19,23 @@ async def client():
         mongodb_db="teacher_ams_test",
         jwt_secret="test-secret",
     )
+    get_user_cache().clear()
+    get_token_cache().clear()
+    get_response_cache().clear()
+    get_token_revocations.cache_clear()
+    get_display_id_allocator.cache_clear()
     motor_client = AsyncMongoMockClient()
     app = create_app(settings=settings, motor_client=motor_client)
 
     db = motor_client[settings.mongodb_db]
-    await init_beanie(database=db, document_models=[User, DailyReport])
+    await init_beanie(database=db, document_models=DOCUMENT_MODELS)
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
+    if get_job_queue.cache_info().currsize:
+        await get_job_queue().shutdown()
+        get_job_queue.cache_clear()
+    if get_report_broker.cache_info().currsize:
+        await get_report_broker().shutdown()
+        get_report_broker.cache_clear()
@@ -0,0 +1,704 @@
+import asyncio
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo.errors import DocumentTooLarge
+
+from app.config import Settings, get_settings
+from app.models.assignment import PeriodAssignment
+from app.models.job import AnalyticsJob
+from app.models.report import DailyReport, PeriodEntry
+from app.models.rollup import ClassDayRollup, TeacherDayRollup
+from app.models.user import Role, User
+from app.schemas.analytics import AnalyticsJobCreate
+from app.schemas.report import DailyReportCreate, DailyReportFilter
+from app.services import analytics, assignments, counter, migrations, rollup
+from app.services.jobs import JobQueue, get_job_queue
+from app.services.metrics import MetricsRegistry
+from app.services.report import create_report, create_reports_bulk
+
+TEACHERS = [PydanticObjectId() for _ in range(3)]
+CLASSES = ["Grade 9-A", "Grade 9-B", "Grade 10-A"]
+
+
+async def seed_reports(days: int = 5) -> None:
+    start = date(2024, 9, 2)
+    reports = []
+    for d in range(days):
+        for c, class_name in enumerate(CLASSES):
+            periods = [
+                PeriodEntry(
+                    period_number=i,
+                    subject="Math",
+                    topic=f"Topic {i}",
+                    subject_teacher_id=TEACHERS[(i + c) % len(TEACHERS)],
+                    signed=(i + d + c) % 3 != 0,
+                )
+                for i in range(1, 9)
+            ]
+            reports.append(
+                DailyReport(
+                    date=start + timedelta(days=d),
+                    class_name=class_name,
+                    class_teacher_id=TEACHERS[c],
+                    periods=periods,
+                    total_periods_taught=sum(1 for p in periods if p.signed),
+                )
+            )
+    await DailyReport.insert_many(reports)
+    await rollup.rebuild_rollups()
+
+
+def python_workload(reports):
+    counter: Counter[str] = Counter()
+    for report in reports:
+        for period in report.periods:
+            if period.signed:
+                counter[str(period.subject_teacher_id)] += 1
+    return dict(counter)
+
+
+FILTERS = [
+    DailyReportFilter(),
+    DailyReportFilter(class_name="Grade 9-B"),
+    DailyReportFilter(class_teacher_id=TEACHERS[2]),
+    DailyReportFilter(subject_teacher_id=TEACHERS[1]),
+    DailyReportFilter(start_date=date(2024, 9, 3), end_date=date(2024, 9, 5)),
+    DailyReportFilter(class_name="Grade 10-A", start_date=date(2024, 9, 4)),
+    DailyReportFilter(end_date=date(2024, 9, 3)),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters", FILTERS)
+async def test_pipelines_match_python_implementation(client, filters):
+    await seed_reports()
+    reports = await analytics.fetch_reports(filters)
+
+    workload = await analytics.workload(filters)
+    assert {w.subject_teacher_id: w.periods_taught for w in workload} == python_workload(reports)
+
+    missed = await analytics.missed_periods(filters)
+    assert sorted((m.report_id, m.class_name, m.date, m.missed_periods) for m in missed) == sorted(
+        (str(r.id), r.class_name, r.date, 8 - r.total_periods_taught) for r in reports
+    )
+
+    summaries = await analytics.daily_summary(filters)
+    assert sorted((s.class_name, s.date, s.taught, s.missed, s.summary) for s in summaries) == sorted(
+        (
+            r.class_name,
+            r.date,
+            r.total_periods_taught,
+            8 - r.total_periods_taught,
+            f"Class {r.class_name} on {r.date.isoformat()}: {r.total_periods_taught}/8 periods taught.",
+        )
+        for r in reports
+    )
+
+
+async def rollup_snapshot():
+    class_rows = await ClassDayRollup.get_motor_collection().find({}, {"_id": 0}).to_list(length=None)
+    teacher_rows = await TeacherDayRollup.get_motor_collection().find({}, {"_id": 0}).to_list(length=None)
+    return (
+        sorted((r["class_name"], r["date"], r["reports"], r["signed"], r["missed"]) for r in class_rows),
+        sorted((str(r["subject_teacher_id"]), r["class_name"], r["date"], r["signed"], r["missed"]) for r in teacher_rows),
+    )
+
+
+@pytest.mark.asyncio
+async def test_incremental_rollups_match_rebuild(client):
+    admin = User(name="Admin", email="admin@example.com", hashed_password="x", role=Role.admin)
+    created = []
+    for d in range(3):
+        for c, class_name in enumerate(CLASSES[:2]):
+            data = DailyReportCreate(
+                date=date(2024, 9, 2) + timedelta(days=d),
+                class_name=class_name,
+                class_teacher_id=TEACHERS[c],
+                periods=[
+                    {
+                        "period_number": i,
+                        "subject": "Math",
+                        "topic": f"Topic {i}",
+                        "subject_teacher_id": TEACHERS[i % 3],
+                        "signed": (i + d) % 2 == 0,
+                    }
+                    for i in range(1, 9)
+                ],
+            )
+            created.append(await create_report(data, admin))
+
+    incremental = await rollup_snapshot()
+    await rollup.rebuild_rollups()
+    assert await rollup_snapshot() == incremental
+
+    await rollup.remove_reports(created)
+    class_rows, teacher_rows = await rollup_snapshot()
+    assert all(row[2:] == (0, 0, 0) for row in class_rows)
+    assert all(row[3:] == (0, 0) for row in teacher_rows)
+
+
+@pytest.mark.asyncio
+async def test_rollup_rebuild_replaces_rows_in_place(client):
+    await seed_reports(days=2)
+    filters = DailyReportFilter()
+    expected = await analytics.missed_periods(filters)
+    class_rollups = ClassDayRollup.get_motor_collection()
+    teacher_rollups = TeacherDayRollup.get_motor_collection()
+    class_ids = {row["_id"] for row in await class_rollups.find({}, {"_id": 1}).to_list(length=None)}
+
+    stale = {"subject_teacher_id": PydanticObjectId(), "class_name": "Gone", "class_teacher_id": TEACHERS[0]}
+    await teacher_rollups.insert_many(
+        [
+            {**stale, "date": datetime(2024, 1, 1), "signed": 1, "missed": 0, "written_at": datetime(2024, 1, 1)},
+            {**stale, "date": datetime(2024, 1, 2), "signed": 1, "missed": 0, "written_at": datetime(2999, 1, 1)},
+        ]
+    )
+    snapshot = await rollup_snapshot()
+
+    await rollup.rebuild_rollups()
+    assert {row["_id"] for row in await class_rollups.find({}, {"_id": 1}).to_list(length=None)} == class_ids
+    assert await teacher_rollups.count_documents({"class_name": "Gone"}) == 1
+    class_rows, teacher_rows = await rollup_snapshot()
+    assert class_rows == snapshot[0]
+    assert [row for row in teacher_rows if row[1] != "Gone"] == [row for row in snapshot[1] if row[1] != "Gone"]
+    assert await analytics.missed_periods(filters) == expected
+
+
+def python_bucket(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day.replace(month=max(m for m in (1, 5, 9) if m <= day.month), day=1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bucket", ["week", "month", "term"])
+@pytest.mark.parametrize("group_by", ["class", "teacher"])
+@pytest.mark.parametrize("use_rollups", [True, False])
+async def test_timeseries_matches_python_buckets(client, monkeypatch, bucket, group_by, use_rollups):
+    monkeypatch.setattr(get_settings(), "analytics_use_rollups", use_rollups)
+    await seed_reports(days=32)
+    filters = DailyReportFilter(start_date=date(2024, 9, 24))
+    reports = await analytics.fetch_reports(filters)
+
+    expected: Counter = Counter()
+    for r in reports:
+        start = python_bucket(r.date, bucket)
+        if group_by == "class":
+            expected[(start, r.class_name, "taught")] += r.total_periods_taught
+            expected[(start, r.class_name, "missed")] += 8 - r.total_periods_taught
+        else:
+            for p in r.periods:
+                expected[(start, str(p.subject_teacher_id), "taught" if p.signed else "missed")] += 1
+
+    items, truncated = await analytics.timeseries(filters, bucket, group_by)
+    assert not truncated
+    actual: Counter = Counter()
+    for item in items:
+        actual[(item.bucket_start, item.group, "taught")] += item.taught
+        actual[(item.bucket_start, item.group, "missed")] += item.missed
+    assert +actual == +expected
+
+
+@pytest.mark.asyncio
+async def test_term_buckets_wrap_to_previous_year(client):
+    collection = DailyReport.get_motor_collection()
+    await collection.insert_many([{"date": datetime(2025, 1, 15)}, {"date": datetime(2025, 7, 1)}])
+    expr = analytics.bucket_start_expression("term", [2, 6, 9])
+    rows = await collection.aggregate([{"$project": {"start": expr}}, {"$sort": {"start": 1}}]).to_list(length=None)
+    assert [row["start"] for row in rows] == [datetime(2024, 9, 1), datetime(2025, 6, 1)]
+
+
+@pytest.mark.parametrize("months", ["[]", "[0, 5]", "[1, 13]"])
+def test_term_start_months_must_be_calendar_months(monkeypatch, months):
+    monkeypatch.setenv("TERM_START_MONTHS", months)
+    with pytest.raises(ValidationError, match="TERM_START_MONTHS"):
+        Settings()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters", FILTERS)
+async def test_numpy_engine_matches_database_engine(client, filters):
+    pytest.importorskip("numpy")
+    await seed_reports()
+
+    assert await analytics.workload(filters, "numpy") == await analytics.workload(filters, "database")
+    assert sorted(await analytics.missed_periods(filters, "numpy"), key=lambda m: m.report_id) == sorted(
+        await analytics.missed_periods(filters, "database"), key=lambda m: m.report_id
+    )
+    assert sorted(await analytics.daily_summary(filters, "numpy"), key=lambda s: (s.date, s.class_name)) == sorted(
+        await analytics.daily_summary(filters, "database"), key=lambda s: (s.date, s.class_name)
+    )
+
+
+@pytest.mark.asyncio
+async def test_coverage_stats(client):
+    pytest.importorskip("numpy")
+    await seed_reports()
+    reports = await analytics.fetch_reports(DailyReportFilter())
+
+    stats = await analytics.coverage_stats(DailyReportFilter())
+    assert stats.reports == len(reports)
+    distribution = Counter(8 - r.total_periods_taught for r in reports)
+    assert stats.missed_distribution == [distribution[n] for n in range(9)]
+    for slot in range(1, 9):
+        misses = sum(1 for r in reports for p in r.periods if p.period_number == slot and not p.signed)
+        assert stats.slot_miss_rates[slot - 1] == pytest.approx(misses / len(reports), abs=1e-4)
+    assert set(stats.missed_percentiles) == {"p50", "p90", "p95", "p99"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("missed_period, fully_signed", [(3, None), (None, True), (None, False), (6, False)])
+async def test_coverage_filters_use_signed_mask(client, missed_period, fully_signed):
+    await seed_reports()
+    everything = await analytics.fetch_reports(DailyReportFilter())
+    expected = {
+        str(r.id)
+        for r in everything
+        if (missed_period is None or not r.periods[missed_period - 1].signed)
+        and (fully_signed is None or (r.total_periods_taught == 8) == fully_signed)
+    }
+
+    filters = DailyReportFilter(missed_period=missed_period, fully_signed=fully_signed)
+    missed = await analytics.missed_periods(filters)
+    assert {m.report_id for m in missed} == expected
+
+
+@pytest.mark.asyncio
+async def test_backfill_period_summaries(client):
+    await seed_reports(days=1)
+    collection = DailyReport.get_motor_collection()
+    await collection.update_many({}, {"$unset": {"signed_mask": "", "teacher_slots": ""}})
+
+    result = await migrations.backfill_period_summaries()
+    assert result == {"reports_updated": len(CLASSES)}
+    for report in await analytics.fetch_reports(DailyReportFilter()):
+        raw = await collection.find_one({"_id": report.id})
+        expected = sum(1 << (p.period_number - 1) for p in report.periods if p.signed)
+        assert raw["signed_mask"] == expected
+        assert sum(share["taught"] for share in raw["teacher_slots"]) == report.total_periods_taught
+
+
+@pytest.mark.asyncio
+async def test_reads_summarize_reports_stored_before_period_summaries(client, monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(get_settings(), "analytics_use_rollups", False)
+    await seed_reports()
+    filters = DailyReportFilter()
+
+    async def results():
+        return (
+            await analytics.workload(filters),
+            sorted(await analytics.workload(filters, "numpy"), key=lambda w: w.subject_teacher_id),
+            await analytics.coverage_stats(filters),
+            await analytics.timeseries(filters, "week", "teacher"),
+            await rollup.rebuild_rollups(),
+            await rollup_snapshot(),
+        )
+
+    expected = await results()
+    collection = DailyReport.get_motor_collection()
+    await collection.update_many({"class_name": "Grade 9-B"}, {"$unset": {"signed_mask": "", "teacher_slots": ""}})
+    assert await results() == expected
+
+
+@pytest.mark.asyncio
+async def test_dedupe_reports_keeps_earliest(client):
+    await seed_reports(days=1)
+    collection = DailyReport.get_motor_collection()
+    await collection.drop_indexes()
+    original = await collection.find_one({"class_name": CLASSES[0]})
+    duplicate = {**original, "_id": PydanticObjectId(), "created_at": datetime(2030, 1, 1)}
+    await collection.insert_one(duplicate)
+
+    assert await migrations.dedupe_reports() == {"reports_removed": 1}
+    remaining = await collection.find({"class_name": CLASSES[0]}).to_list(length=None)
+    assert [doc["_id"] for doc in remaining] == [original["_id"]]
+
+
+async def signup_and_login(client, name: str, email: str) -> dict:
+    await client.post("/auth/signup", json={"name": name, "email": email, "password": "password123"})
+    res = await client.post("/auth/login", json={"email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_analytics_jobs_run_in_background(client):
+    await seed_reports()
+    owner = await signup_and_login(client, "Ann", "ann@example.com")
+    other = await signup_and_login(client, "Ben", "ben@example.com")
+
+    res = await client.post(
+        "/analytics/jobs",
+        json={"kind": "workload", "filters": {"class_name": "Grade 9-B"}},
+        headers=owner,
+    )
+    assert res.status_code == 202
+    job = res.json()
+    assert job["status"] == "queued"
+    assert res.headers["location"] == f"/analytics/jobs/{job['id']}"
+
+    await get_job_queue().join()
+    res = await client.get(f"/analytics/jobs/{job['id']}", headers=owner)
+    assert res.status_code == 200
+    finished = res.json()
+    assert finished["status"] == "succeeded"
+    expected = await analytics.workload(DailyReportFilter(class_name="Grade 9-B"))
+    assert finished["result"] == [item.model_dump(mode="json") for item in expected]
+
+    assert (await client.get(f"/analytics/jobs/{job['id']}", headers=other)).status_code == 404
+    assert (await client.get("/analytics/jobs/not-an-id", headers=owner)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_analytics_job_queue_rejects_work_when_full(client):
+    user = User(name="Ann", email="ann@example.com", hashed_password="x", role=Role.admin)
+    await user.insert()
+    queue = JobQueue(workers=0, max_queued=1, ttl=60)
+    try:
+        await queue.submit(AnalyticsJobCreate(kind="workload"), user)
+        with pytest.raises(HTTPException) as exc:
+            await queue.submit(AnalyticsJobCreate(kind="workload"), user)
+        assert exc.value.status_code == 503
+        assert queue.stats()["queued"] == 1
+    finally:
+        await queue.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_job_submissions_respect_queue_size(client, monkeypatch):
+    user = User(name="Ann", email="ann@example.com", hashed_password="x", role=Role.admin)
+    await user.insert()
+    insert = AnalyticsJob.insert
+
+    async def yielding_insert(self, **kwargs):
+        await asyncio.sleep(0)
+        return await insert(self, **kwargs)
+
+    monkeypatch.setattr(AnalyticsJob, "insert", yielding_insert)
+    queue = JobQueue(workers=0, max_queued=2, ttl=60)
+    try:
+        results = await asyncio.gather(
+            *(queue.submit(AnalyticsJobCreate(kind="workload"), user) for _ in range(6)), return_exceptions=True
+        )
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 4 and all(r.status_code == 503 for r in rejected)
+        assert await AnalyticsJob.count() == 2
+        assert queue.stats()["queued"] == 2
+        assert all(job.expires_at is None for job in await AnalyticsJob.find_all().to_list())
+    finally:
+        await queue.shutdown()
+    jobs = await AnalyticsJob.find_all().to_list()
+    assert [job.status for job in jobs] == ["failed", "failed"]
+    assert all(job.expires_at is not None for job in jobs)
+
+
+@pytest.mark.asyncio
+async def test_analytics_job_fails_when_result_cannot_be_stored(client, monkeypatch):
+    await seed_reports()
+    user = User(name="Ann", email="ann@example.com", hashed_password="x", role=Role.admin)
+    await user.insert()
+    set_fields = AnalyticsJob.set
+
+    async def limited_set(self, expression, **kwargs):
+        if AnalyticsJob.result in expression:
+            raise DocumentTooLarge("BSON document too large")
+        return await set_fields(self, expression, **kwargs)
+
+    monkeypatch.setattr(AnalyticsJob, "set", limited_set)
+    queue = JobQueue(workers=1, max_queued=1, ttl=60)
+    try:
+        job = await queue.submit(AnalyticsJobCreate(kind="daily-summary"), user)
+        await queue.join()
+    finally:
+        await queue.shutdown()
+    stored = await AnalyticsJob.get(job.id)
+    assert stored.status == "failed"
+    assert "DocumentTooLarge" in stored.error
+    assert stored.expires_at is not None
+    assert queue.stats()["failed"] == 1 and queue.stats()["completed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_share_one_computation(client, monkeypatch):
+    await seed_reports()
+    calls = []
+    workload_rows = rollup.workload_rows
+
+    async def slow_workload_rows(filters):
+        calls.append(filters)
+        await asyncio.sleep(0.01)
+        return await workload_rows(filters)
+
+    monkeypatch.setattr(rollup, "workload_rows", slow_workload_rows)
+    metrics = MetricsRegistry()
+    monkeypatch.setattr(analytics, "singleflight", analytics.SingleFlight(metrics))
+
+    results = await asyncio.gather(
+        *(analytics.workload(DailyReportFilter(class_name="Grade 9-A")) for _ in range(4)),
+        analytics.workload(DailyReportFilter(class_name="Grade 9-A"), "database"),
+        analytics.workload(DailyReportFilter(class_name="Grade 9-B")),
+    )
+    assert len(calls) == 2
+    assert all(result == results[0] for result in results[:5])
+    assert results[5] != results[0]
+    rendered = metrics.render()
+    assert 'analytics_singleflight_calls_total{outcome="coalesced",query="workload"} 4' in rendered
+    assert 'analytics_singleflight_calls_total{outcome="executed",query="workload"} 2' in rendered
+    assert analytics.singleflight.in_flight() == 0
+
+    await analytics.workload(DailyReportFilter(class_name="Grade 9-A"))
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_calls_after_a_report_write_do_not_join_older_computations(client, monkeypatch):
+    admin = User(name="Admin", email="admin@example.com", hashed_password="x", role=Role.admin)
+    await admin.insert()
+    release = asyncio.Event()
+    aggregate_reports = analytics.aggregate_reports
+
+    async def blocked_aggregate_reports(filters, pipeline):
+        rows = await aggregate_reports(filters, pipeline)
+        await release.wait()
+        return rows
+
+    monkeypatch.setattr(analytics, "aggregate_reports", blocked_aggregate_reports)
+    before = asyncio.ensure_future(analytics.daily_summary(DailyReportFilter()))
+    await asyncio.sleep(0.01)
+
+    periods = [
+        {"period_number": i, "subject": "PE", "topic": "Relay", "subject_teacher_id": TEACHERS[0], "signed": True}
+        for i in range(1, 9)
+    ]
+    payload = DailyReportCreate(date=date(2024, 9, 9), class_name="Grade 8-C", class_teacher_id=TEACHERS[0], periods=periods)
+    await create_report(payload, admin)
+    after = asyncio.ensure_future(analytics.daily_summary(DailyReportFilter()))
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await before == []
+    assert [summary.class_name for summary in await after] == ["Grade 8-C"]
+
+
+@pytest.mark.asyncio
+async def test_cached_endpoints_read_the_reports_version_once(client, monkeypatch):
+    await seed_reports()
+    headers = await signup_and_login(client, "Ann", "ann@example.com")
+    reads = []
+    current = counter.current
+
+    async def counted_current(name):
+        reads.append(name)
+        return await current(name)
+
+    monkeypatch.setattr(counter, "current", counted_current)
+    res = await client.get("/analytics/workload", headers=headers)
+    assert res.status_code == 200
+    assert reads == [counter.REPORTS_VERSION]
+    assert counter.known_reports_version.get() is None
+
+
+@pytest.mark.asyncio
+async def test_teacher_endpoints_match_report_periods(client):
+    await seed_reports()
+    assert await assignments.rebuild_assignments() == {"period_assignments": 15 * 8}
+    headers = await signup_and_login(client, "Ann", "ann@example.com")
+    teacher = TEACHERS[1]
+    reports = await analytics.fetch_reports(DailyReportFilter(start_date=date(2024, 9, 3), end_date=date(2024, 9, 5)))
+    expected = sorted(
+        (report.date.isoformat(), report.class_name, period.period_number, period.signed)
+        for report in reports
+        for period in report.periods
+        if period.subject_teacher_id == teacher
+    )
+
+    res = await client.get(
+        f"/teachers/{teacher}/periods",
+        params={"start_date": "2024-09-03", "end_date": "2024-09-05"},
+        headers=headers,
+    )
+    body = res.json()
+    assert not body["truncated"]
+    assert [(p["date"], p["class_name"], p["period_number"], p["signed"]) for p in body["items"]] == expected
+
+    res = await client.get(f"/teachers/{teacher}/periods", params={"signed": "false", "limit": 2}, headers=headers)
+    assert len(res.json()["items"]) == 2 and res.json()["truncated"]
+    assert not any(p["signed"] for p in res.json()["items"])
+
+    res = await client.get(
+        f"/teachers/{teacher}/workload",
+        params={"start_date": "2024-09-03", "end_date": "2024-09-05"},
+        headers=headers,
+    )
+    workload = res.json()
+    assert workload["assigned"] == len(expected)
+    assert workload["taught"] == sum(1 for row in expected if row[3])
+    assert [day["date"] for day in workload["days"]] == ["2024-09-03", "2024-09-04", "2024-09-05"]
+    assert workload["taught"] == python_workload(reports)[str(teacher)]
+
+
+@pytest.mark.asyncio
+async def test_period_assignments_follow_report_writes(client):
+    admin = User(name="Admin", email="admin@example.com", hashed_password="x", role=Role.admin)
+    await admin.insert()
+    periods = [
+        {"period_number": i, "subject": "PE", "topic": "Relay", "subject_teacher_id": TEACHERS[0], "signed": i != 3}
+        for i in range(1, 9)
+    ]
+    payload = DailyReportCreate(date=date(2024, 9, 9), class_name="Grade 8-C", class_teacher_id=TEACHERS[0], periods=periods)
+    await create_report(payload, admin)
+    await create_report(payload, admin)
+
+    workload = await assignments.teacher_workload(TEACHERS[0], None, None)
+    assert (workload.assigned, workload.taught) == (8, 7)
+    assert await assignments.rebuild_assignments() == {"period_assignments": 8}
+
+
+@pytest.mark.asyncio
+async def test_retried_submission_repairs_interrupted_side_effects(client, monkeypatch):
+    admin = User(name="Admin", email="admin@example.com", hashed_password="x", role=Role.admin)
+    await admin.insert()
+    periods = [
+        {"period_number": i, "subject": "PE", "topic": "Relay", "subject_teacher_id": TEACHERS[0], "signed": i != 3}
+        for i in range(1, 9)
+    ]
+    payload = DailyReportCreate(date=date(2024, 9, 9), class_name="Grade 8-C", class_teacher_id=TEACHERS[0], periods=periods)
+    add_reports = assignments.add_reports
+
+    async def failing_add_reports(reports):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(assignments, "add_reports", failing_add_reports)
+    with pytest.raises(RuntimeError):
+        await create_report(payload, admin)
+    monkeypatch.setattr(assignments, "add_reports", add_reports)
+    version = await counter.current(counter.REPORTS_VERSION)
+
+    await create_report(payload, admin)
+    workload = await assignments.teacher_workload(TEACHERS[0], None, None)
+    assert (workload.assigned, workload.taught) == (8, 7)
+    assert await counter.current(counter.REPORTS_VERSION) == version + 1
+    incremental = await rollup_snapshot()
+    await rollup.rebuild_rollups()
+    assert await rollup_snapshot() == incremental
+    version = await counter.current(counter.REPORTS_VERSION)
+
+    # Once the side effects are done, a further retry writes nothing.
+    await create_report(payload, admin)
+    assert await counter.current(counter.REPORTS_VERSION) == version
+
+
+@pytest.mark.asyncio
+async def test_concurrent_retries_write_interrupted_side_effects_once(client, monkeypatch):
+    admin = User(name="Admin", email="admin@example.com", hashed_password="x", role=Role.admin)
+    await admin.insert()
+    periods = [
+        {"period_number": i, "subject": "PE", "topic": "Relay", "subject_teacher_id": TEACHERS[0], "signed": True}
+        for i in range(1, 9)
+    ]
+    payload = DailyReportCreate(date=date(2024, 9, 9), class_name="Grade 8-C", class_teacher_id=TEACHERS[0], periods=periods)
+    add_reports = assignments.add_reports
+
+    async def failing_add_reports(reports):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(assignments, "add_reports", failing_add_reports)
+    with pytest.raises(RuntimeError):
+        await create_reports_bulk([payload.model_dump(mode="json")], admin)
+    monkeypatch.setattr(assignments, "add_reports", add_reports)
+    version = await counter.current(counter.REPORTS_VERSION)
+
+    await asyncio.gather(*(create_report(payload, admin) for _ in range(3)))
+    assert await counter.current(counter.REPORTS_VERSION) == version + 1
+    workload = await assignments.teacher_workload(TEACHERS[0], None, None)
+    assert (workload.assigned, workload.taught) == (8, 8)
+
+
+@pytest.mark.asyncio
+async def test_bulk_resubmission_repairs_interrupted_side_effects(client, monkeypatch):
+    admin = User(name="Admin", email="admin@example.com", hashed_password="x", role=Role.admin)
+    await admin.insert()
+    items = [
+        DailyReportCreate(
+            date=date(2024, 9, 9),
+            class_name=class_name,
+            class_teacher_id=TEACHERS[0],
+            periods=[
+                {"period_number": i, "subject": "PE", "topic": "Relay", "subject_teacher_id": TEACHERS[1], "signed": True}
+                for i in range(1, 9)
+            ],
+        ).model_dump(mode="json")
+        for class_name in CLASSES[:2]
+    ]
+    add_reports = assignments.add_reports
+
+    async def failing_add_reports(reports):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(assignments, "add_reports", failing_add_reports)
+    with pytest.raises(RuntimeError):
+        await create_reports_bulk(items, admin)
+    monkeypatch.setattr(assignments, "add_reports", add_reports)
+    assert (await assignments.teacher_workload(TEACHERS[1], None, None)).assigned == 0
+
+    results = await create_reports_bulk(items, admin)
+    assert [result.ok for result in results] == [False, False]
+    workload = await assignments.teacher_workload(TEACHERS[1], None, None)
+    assert (workload.assigned, workload.taught) == (16, 16)
+    assert await DailyReport.find({"effects_pending": {"$exists": True}}).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_and_backfills_retire_cached_responses(client):
+    await seed_reports(days=1)
+    await DailyReport.get_motor_collection().update_many({}, {"$unset": {"signed_mask": "", "teacher_slots": ""}})
+    steps = [
+        migrations.backfill_period_summaries,
+        rollup.rebuild_rollups,
+        assignments.rebuild_assignments,
+        migrations.backfill_period_assignments,
+    ]
+    for step in steps:
+        version = await counter.current(counter.REPORTS_VERSION)
+        await step()
+        assert await counter.current(counter.REPORTS_VERSION) == version + 1, step.__name__
+
+    # Runs that change nothing keep the cache.
+    version = await counter.current(counter.REPORTS_VERSION)
+    await migrations.backfill_period_summaries()
+    await migrations.backfill_period_assignments()
+    assert await counter.current(counter.REPORTS_VERSION) == version
+
+
+@pytest.mark.asyncio
+async def test_assignment_rebuild_replaces_rows_in_place(client):
+    await seed_reports(days=1)
+    assert await migrations.backfill_period_assignments() == {"period_assignments": len(CLASSES) * 8}
+    assert await migrations.backfill_period_assignments() == {"period_assignments": 0}
+    collection = PeriodAssignment.get_motor_collection()
+    ids = {row["_id"] for row in await collection.find({}, {"_id": 1}).to_list(length=None)}
+
+    orphan = {"subject_teacher_id": TEACHERS[0], "class_name": "Gone", "period_number": 1, "subject": "Art"}
+    await collection.insert_many(
+        [
+            {**orphan, "date": datetime(2024, 1, 1), "signed": True, "report_id": PydanticObjectId()},
+            {
+                **orphan,
+                "date": datetime(2024, 1, 2),
+                "signed": True,
+                "report_id": PydanticObjectId(),
+                "written_at": datetime(2999, 1, 1),
+            },
+        ]
+    )
+    assert await assignments.rebuild_assignments() == {"period_assignments": len(CLASSES) * 8}
+    rows = await collection.find({}, {"_id": 1, "class_name": 1}).to_list(length=None)
+    assert {row["_id"] for row in rows if row["class_name"] != "Gone"} == ids
+    assert [row for row in rows if row["class_name"] == "Gone"] and len(rows) == len(ids) + 1
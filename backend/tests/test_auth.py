@@ -1,4 +1,22 @@
+import asyncio
+import csv
+
 import pytest
+from passlib.hash import pbkdf2_sha256
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.models.user import Role, User
+from app.services.auth import (
+    TokenRevocations,
+    create_access_token,
+    decode_token,
+    get_password_hasher,
+    pwd_context,
+)
+from app.services import counter
+from app.services.counter import DISPLAY_ID_SEQUENCE, BlockAllocator
+from app.services.cache import TTLCache, get_user_cache, invalidate_user
 
 
 @pytest.mark.asyncio
@@ -20,3 +38,196 @@ async def test_signup_and_login_flow(client):
     me = me_res.json()
     assert me["email"] == "alice@example.com"
     assert me["role"] == "teacher"
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_served_from_cache(client):
+    await client.post(
+        "/auth/signup",
+        json={"name": "Gus", "email": "gus@example.com", "password": "password123"},
+    )
+    token = (
+        await client.post("/auth/login", json={"email": "gus@example.com", "password": "password123"})
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_cache = get_user_cache()
+
+    first = await client.get("/auth/me", headers=headers)
+    hits = user_cache.hits
+    second = await client.get("/auth/me", headers=headers)
+    assert first.json() == second.json()
+    assert user_cache.hits == hits + 1
+
+    invalidate_user(first.json()["id"])
+    await client.get("/auth/me", headers=headers)
+    assert user_cache.hits == hits + 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_login_upgrades_outdated_password_hash(client):
+    await client.post(
+        "/auth/signup",
+        json={"name": "Hana", "email": "hana@example.com", "password": "password123"},
+    )
+    user = await User.find_one({"email": "hana@example.com"})
+    # passlib's default round count, which hashes stored before PBKDF2_ROUNDS was raised use.
+    weak_hash = pbkdf2_sha256.using(rounds=29000).hash("password123")
+    await user.set({User.hashed_password: weak_hash})
+    get_user_cache().set(str(user.id), user)
+    assert pwd_context.needs_update(weak_hash)
+
+    login_res = await client.post("/auth/login", json={"email": "hana@example.com", "password": "password123"})
+    assert login_res.status_code == 200
+
+    user = await User.find_one({"email": "hana@example.com"})
+    assert user.hashed_password.split("$")[2] == str(get_settings().password_hash_rounds)
+    assert not pwd_context.needs_update(user.hashed_password)
+    assert get_user_cache().get(str(user.id)) is None
+    assert get_password_hasher().stats()["queue_depth"] == 0
+
+
+async def signup_and_login(client, email: str) -> str:
+    await client.post("/auth/signup", json={"name": "Ivy", "email": email, "password": "password123"})
+    res = await client.post("/auth/login", json={"email": email, "password": "password123"})
+    return res.json()["access_token"]
+
+
+@pytest.mark.asyncio
+async def test_read_endpoints_authorize_from_token_claims(client, monkeypatch):
+    token = await signup_and_login(client, "ivy@example.com")
+    claims = decode_token(token, get_settings())
+    assert claims["role"] == "teacher"
+    assert claims["display_id"].startswith("T-")
+    assert claims["ver"] == 0
+
+    async def no_user_lookup(*args, **kwargs):
+        raise AssertionError("user lookup on a claims-only route")
+
+    monkeypatch.setattr(User, "get", no_user_lookup)
+    res = await client.get("/analytics/workload", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    res = await client.get("/diagnostics/query-plans", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_tokens_without_role_claims_fall_back_to_user_lookup(client):
+    await signup_and_login(client, "ivy@example.com")
+    user = await User.find_one({"email": "ivy@example.com"})
+    legacy, _ = create_access_token(str(user.id), get_settings())
+    res = await client.get("/analytics/workload", headers={"Authorization": f"Bearer {legacy}"})
+    assert res.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_logout_all_revokes_issued_tokens(client):
+    token = await signup_and_login(client, "ivy@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert (await client.get("/analytics/workload", headers=headers)).status_code == 200
+
+    assert (await client.post("/auth/logout-all", headers=headers)).status_code == 204
+    assert (await client.get("/analytics/workload", headers=headers)).status_code == 401
+    assert (await client.get("/auth/me", headers=headers)).status_code == 401
+
+    # Another process only learns about the revocation when its cached set is reloaded.
+    fresh = TokenRevocations(ttl=60)
+    user = await User.find_one({"email": "ivy@example.com"})
+    assert await fresh.min_version(str(user.id)) == 1
+
+    new_token = (
+        await client.post("/auth/login", json={"email": "ivy@example.com", "password": "password123"})
+    ).json()["access_token"]
+    assert (await client.get("/analytics/workload", headers={"Authorization": f"Bearer {new_token}"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_display_ids_come_from_reserved_counter_blocks(client):
+    res = await client.post("/auth/signup", json={"name": "Max", "email": "max@example.com", "password": "password123"})
+    assert res.json()["display_id"] == "T-0000001"
+
+    first, second = BlockAllocator(DISPLAY_ID_SEQUENCE, 3), BlockAllocator(DISPLAY_ID_SEQUENCE, 3)
+    values = await asyncio.gather(*(allocator.take() for allocator in (first, second) for _ in range(4)))
+    flat = [value for batch in values for value in batch]
+    assert len(set(flat)) == len(flat) == 8
+    # Eight ids took four blocks of three on top of the block reserved by the signup.
+    assert await counter.current(DISPLAY_ID_SEQUENCE) == get_settings().display_id_block_size + 12
+
+    taken = User(name="Dup", email="dup@example.com", hashed_password="x", display_id=res.json()["display_id"])
+    with pytest.raises(DuplicateKeyError):
+        await taken.insert()
+
+
+async def admin_headers(client) -> dict:
+    await User(
+        name="Root", email="root@example.com", hashed_password=pwd_context.hash("password123"), role=Role.admin
+    ).insert()
+    res = await client.post("/auth/login", json={"email": "root@example.com", "password": "password123"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_user_import_reports_per_row_results(client):
+    headers = await admin_headers(client)
+    teacher = await signup_and_login(client, "ivy@example.com")
+    rows = [
+        {"name": "Nia", "email": "nia@example.com", "password": "password123"},
+        {"name": "Ivy", "email": "ivy@example.com", "password": "password123"},
+        {"name": "Nia again", "email": "nia@example.com", "password": "password123"},
+        {"name": "Oz", "email": "not-an-email", "password": "password123"},
+        {"name": "Pam", "email": "pam@example.com", "password": "password123", "role": "admin"},
+        {"name": "Quo", "email": 123, "password": "password123"},
+    ]
+    forbidden = await client.post("/auth/users/bulk", json=rows, headers={"Authorization": f"Bearer {teacher}"})
+    assert forbidden.status_code == 403
+
+    res = await client.post("/auth/users/bulk", json=rows, headers=headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert (body["created"], body["failed"]) == (2, 4)
+    items = body["items"]
+    assert [item["ok"] for item in items] == [True, False, False, False, True, False]
+    assert items[1]["error"] == "User already exists"
+    assert items[2]["error"] == "Duplicate email in this batch"
+    assert items[3]["error"].startswith("email:")
+    assert items[0]["display_id"] != items[4]["display_id"]
+    assert items[5]["email"] is None and items[5]["error"].startswith("email:")
+
+    login = await client.post("/auth/login", json={"email": "pam@example.com", "password": "password123"})
+    assert decode_token(login.json()["access_token"], get_settings())["role"] == "admin"
+
+
+@pytest.mark.asyncio
+async def test_bulk_user_import_from_csv(client):
+    headers = await admin_headers(client)
+    content = "name,email,password,role\nQuin,quin@example.com,password123,\nRay,ray@example.com,short,teacher\n"
+    res = await client.post(
+        "/auth/users/bulk/csv", files={"file": ("staff.csv", content, "text/csv")}, headers=headers
+    )
+    assert res.status_code == 200
+    items = res.json()["items"]
+    assert items[0]["ok"] and items[0]["email"] == "quin@example.com"
+    assert not items[1]["ok"] and items[1]["error"].startswith("password:")
+
+    bad = await client.post(
+        "/auth/users/bulk/csv", files={"file": ("staff.csv", "name,email\nA,a@example.com\n", "text/csv")}, headers=headers
+    )
+    assert bad.status_code == 400
+    assert bad.json()["detail"] == "The CSV file is missing columns: password"
+
+    oversized = "name,email,password\n" + "A" * (csv.field_size_limit() + 1) + ",a@example.com,password123\n"
+    unparsable = await client.post(
+        "/auth/users/bulk/csv", files={"file": ("staff.csv", oversized, "text/csv")}, headers=headers
+    )
+    assert unparsable.status_code == 400
+    assert unparsable.json()["detail"].startswith("The CSV file could not be parsed")
@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.api_bench import parse_args, percentile, run_benchmark
+
+
+def test_percentile_uses_nearest_rank():
+    ordered = [float(i) for i in range(1, 101)]
+    assert percentile(ordered, 50) == 50.0
+    assert percentile(ordered, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+@pytest.mark.asyncio
+async def test_benchmark_smoke_run():
+    args = parse_args(["--classes", "2", "--teachers", "3", "--months", "1", "--requests", "3", "--concurrency", "2"])
+    results = await run_benchmark(args)
+    assert results["meta"]["reports"] > 0
+    assert set(results["results"]) == {
+        "auth_login",
+        "reports_create",
+        "reports_list",
+        "analytics_workload",
+        "analytics_missed_periods",
+        "analytics_daily_summary",
+    }
+    for summary in results["results"].values():
+        assert summary["requests"] == 3
+        assert summary["errors"] == 0
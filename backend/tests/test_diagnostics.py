@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Set
+
+import pytest
+
+from app.models.report import DailyReport
+from app.services import diagnostics
+from app.services.diagnostics import aggregate_planner, filter_combinations, summarize_plan
+from app.services.query import build_query
+
+
+def referenced_fields(value: Any) -> Set[str]:
+    if isinstance(value, str):
+        return {value[1:].split(".")[0]} if value.startswith("$") and not value.startswith("$$") else set()
+    if isinstance(value, dict):
+        return set().union(*map(referenced_fields, value.values()), set())
+    if isinstance(value, list):
+        return set().union(*map(referenced_fields, value), set())
+    return set()
+
+
+async def index_planner(collection: Any, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Stand-in for the server planner: an index is usable only with a predicate on its leading field.
+
+    Without one, a find sorted on (date, _id) walks that whole index and an aggregation scans the collection.
+    """
+    if "find" in command:
+        query, rest, sort = command["filter"], [], command.get("sort")
+    else:
+        stages: List[Dict[str, Any]] = command["pipeline"]
+        query, rest, sort = stages[0]["$match"], stages[1:], None
+    needed = set(query) | referenced_fields(rest)
+    best = None
+    for name, info in (await collection.index_information()).items():
+        fields = [field for field, _ in info["key"]]
+        prefix = next((i for i, field in enumerate(fields) if field not in query), len(fields))
+        rank = (prefix, needed <= set(fields))
+        if prefix and (best is None or rank > best[0]):
+            best = rank, name, fields
+    if best:
+        (_, covers), name, fields = best
+        bounds = {field: ["[1, 1]"] if field in query else ["[MinKey, MaxKey]"] for field in fields}
+        scan = {"stage": "IXSCAN", "indexName": name, "indexBounds": bounds}
+        plan = {"stage": "PROJECTION_COVERED" if covers and rest else "FETCH", "inputStage": scan}
+    elif sort:
+        bounds = {"date": ["[MinKey, MaxKey]"], "_id": ["[MinKey, MaxKey]"]}
+        plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "date_1__id_1", "indexBounds": bounds}}
+    else:
+        plan = {"stage": "COLLSCAN"}
+    planner = {"queryPlanner": {"winningPlan": plan}}
+    return planner if "find" in command else {"stages": [{"$cursor": planner}, *rest]}
+
+
+def test_filter_combinations_cover_every_filter_subset():
+    combos = [names for names, _ in filter_combinations()]
+    assert len(combos) == 64
+    assert [] in combos
+    assert [
+        "class_name",
+        "class_teacher_id",
+        "subject_teacher_id",
+        "date_range",
+        "missed_period",
+        "fully_signed",
+    ] in combos
+
+
+def test_summarize_plan_detects_collscan_and_indexes():
+    ixscan = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN", "indexName": "class_name_1_date_1"},
+            }
+        }
+    }
+    plan = summarize_plan(["class_name"], ixscan)
+    assert plan.stages == ["FETCH", "IXSCAN"]
+    assert plan.indexes == ["class_name_1_date_1"]
+    assert not plan.collscan
+    assert not plan.covered
+
+    collscan = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}}
+    assert summarize_plan([], collscan).collscan
+
+
+def test_aggregate_plans_report_whether_they_are_covered():
+    covered = {
+        "stages": [
+            {
+                "$cursor": {
+                    "queryPlanner": {
+                        "winningPlan": {
+                            "stage": "PROJECTION_COVERED",
+                            "inputStage": {"stage": "IXSCAN", "indexName": "subject_teacher_id_1_date_1_signed_1"},
+                        }
+                    }
+                }
+            },
+            {"$group": {}},
+        ]
+    }
+    plan = summarize_plan(["teacher_workload"], aggregate_planner(covered))
+    assert plan.covered and plan.indexes == ["subject_teacher_id_1_date_1_signed_1"]
+
+    pushed_down = {
+        "queryPlanner": {
+            "winningPlan": {
+                "queryPlan": {
+                    "stage": "GROUP",
+                    "inputStage": {
+                        "stage": "FETCH",
+                        "inputStage": {"stage": "IXSCAN", "indexName": "subject_teacher_id_1_date_1_class_name_1_period_number_1"},
+                    },
+                }
+            }
+        }
+    }
+    assert not summarize_plan(["teacher_workload"], aggregate_planner(pushed_down)).covered
+
+
+def test_coverage_filter_samples_query_signed_mask():
+    queries = {tuple(names): build_query(filters) for names, filters in filter_combinations()}
+    assert "$in" in queries[("missed_period",)]["signed_mask"]
+    assert "$in" in queries[("fully_signed",)]["signed_mask"]
+    assert queries[("missed_period", "fully_signed")]["signed_mask"]["$in"]
+
+
+def test_summarize_plan_flags_filtered_queries_that_walk_a_whole_index():
+    walk = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {
+                    "stage": "IXSCAN",
+                    "indexName": "date_1__id_1",
+                    "indexBounds": {"date": ["[MinKey, MaxKey]"], "_id": ["[MinKey, MaxKey]"]},
+                },
+            }
+        }
+    }
+    assert summarize_plan(["class_name"], walk).unbounded
+    assert not summarize_plan(["class_name"], walk).collscan
+    assert not summarize_plan([], walk).unbounded
+
+    bounded = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "IXSCAN",
+                "indexName": "signed_mask_1_date_1",
+                "indexBounds": {"signed_mask": ["[0, 0]", "[1, 1]"], "date": ["[MinKey, MaxKey]"]},
+            }
+        }
+    }
+    assert not summarize_plan(["missed_period"], bounded).unbounded
+
+
+@pytest.mark.asyncio
+async def test_declared_indexes_keep_every_report_query_index_bounded(client, monkeypatch):
+    monkeypatch.setattr(diagnostics, "run_explain", index_planner)
+    await diagnostics.assert_no_collscans()
+
+    report = await diagnostics.explain_report_queries()
+    queries = {plan.query for plan in report.plans}
+    assert queries == {"find", "report_totals", "workload", "timeseries_class", "timeseries_teacher"}
+    assert report.ok and report.covered_aggregations[0].covered
+
+
+@pytest.mark.asyncio
+async def test_check_fails_when_an_index_is_missing(client, monkeypatch):
+    monkeypatch.setattr(diagnostics, "run_explain", index_planner)
+    await DailyReport.get_motor_collection().drop_index("class_name_1_date_1")
+
+    report = await diagnostics.explain_report_queries()
+    assert not report.ok
+    walks = [plan for plan in report.plans if plan.unbounded]
+    assert walks and all(plan.query == "find" and "class_name" in plan.filters for plan in walks)
+    scans = [plan for plan in report.plans if plan.collscan]
+    assert scans and all(plan.query != "find" and "class_name" in plan.filters for plan in scans)
+    with pytest.raises(AssertionError, match="class_name"):
+        await diagnostics.assert_no_collscans()
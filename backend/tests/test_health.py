@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+from pymongo.read_preferences import SecondaryPreferred
+
+from app.config import Settings
+from app.services import database
+from app.services.metrics import MetricsRegistry, PoolMonitor
+
+
+@pytest.mark.asyncio
+async def test_health_reports_ping_and_pool(client):
+    res = await client.get("/health")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["status"] == "ok"
+    assert body["database"]["ok"]
+    assert body["database"]["ping_ms"] >= 0
+    assert body["pool"]["max_pool_size"] == 100
+    assert body["analytics_read_preference"] == "primary"
+
+
+def test_client_options_from_settings():
+    settings = Settings(
+        mongodb_max_pool_size=20,
+        mongodb_min_pool_size=2,
+        mongodb_max_idle_time_ms=60_000,
+        mongodb_compressors=["zstd", "zlib"],
+    )
+    options = database.client_options(settings)
+    assert options["maxPoolSize"] == 20
+    assert options["minPoolSize"] == 2
+    assert options["maxIdleTimeMS"] == 60_000
+    assert options["compressors"] == "zstd,zlib"
+    assert "compressors" not in database.client_options(Settings())
+
+
+def test_analytics_collection_uses_configured_read_preference(monkeypatch):
+    calls = []
+
+    class Collection:
+        def with_options(self, **kwargs):
+            calls.append(kwargs)
+            return self
+
+    model = SimpleNamespace(get_motor_collection=Collection)
+    monkeypatch.setattr(database, "get_settings", lambda: Settings())
+    database.analytics_collection(model)
+    assert calls == []
+
+    monkeypatch.setattr(
+        database, "get_settings", lambda: Settings(mongodb_analytics_read_preference="secondaryPreferred")
+    )
+    database.analytics_collection(model)
+    assert isinstance(calls[0]["read_preference"], SecondaryPreferred)
+
+
+def test_pool_monitor_tracks_checked_out_connections():
+    monitor = PoolMonitor(MetricsRegistry())
+    address = ("db", 27017)
+    monitor.pool_created(SimpleNamespace(address=address))
+    for _ in range(3):
+        monitor.connection_created(SimpleNamespace(address=address))
+    monitor.connection_checked_out(SimpleNamespace(address=address, duration=0.002))
+    monitor.connection_checked_out(SimpleNamespace(address=address, duration=0.001))
+    monitor.connection_checked_in(SimpleNamespace(address=address))
+    monitor.connection_closed(SimpleNamespace(address=address))
+
+    stats = monitor.snapshot()["db:27017"]
+    assert stats.open == 2
+    assert stats.checked_out == 1
+    assert "mongo_pool_checkout_seconds_count 2" in monitor.metrics.render()
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.metrics import CommandTimer, MetricsRegistry, RequestStats, current_request
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_and_metrics_endpoint(client):
+    await client.post(
+        "/auth/signup",
+        json={"name": "Jo", "email": "jo@example.com", "password": "password123"},
+    )
+    login_res = await client.post("/auth/login", json={"email": "jo@example.com", "password": "password123"})
+    token = login_res.json()["access_token"]
+
+    me_res = await client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    timing = me_res.headers["server-timing"]
+    assert "jwt;dur=" in timing
+    assert "db;dur=" in timing
+    assert "total;dur=" in timing
+
+    metrics_res = await client.get("/metrics")
+    assert metrics_res.status_code == 200
+    assert 'http_requests_total{method="GET",route="/auth/me",status="200"}' in metrics_res.text
+    assert "password_hasher{" in metrics_res.text
+
+
+def test_command_timer_records_into_request_stats():
+    metrics = MetricsRegistry()
+    timer = CommandTimer(metrics)
+    stats = RequestStats()
+    token = current_request.set(stats)
+    try:
+        timer.succeeded(
+            SimpleNamespace(
+                command_name="find",
+                duration_micros=2500,
+                reply={"cursor": {"firstBatch": [{}, {}, {}]}},
+            )
+        )
+    finally:
+        current_request.reset(token)
+
+    assert stats.db_commands == 1
+    assert stats.db_documents == 3
+    assert stats.db_seconds == pytest.approx(0.0025)
+    rendered = metrics.render()
+    assert 'mongo_commands_total{command="find"} 1' in rendered
+    assert 'mongo_documents_returned_total{command="find"} 3' in rendered
+    assert 'mongo_command_duration_seconds_bucket{command="find",le="0.005"} 1' in rendered
@@ -1,4 +1,20 @@
+import asyncio
+import csv
+import io
+import json
+
 import pytest
+from fastapi import HTTPException
+
+from app.services.events import (
+    KEEPALIVE_FRAME,
+    RESYNC_FRAME,
+    RETRY_FRAME,
+    ReportBroker,
+    Subscription,
+    get_report_broker,
+    stream_frames,
+)
 
 
 @pytest.mark.asyncio
@@ -48,7 +64,9 @@ async def test_create_and_fetch_report(client):
         headers={"Authorization": f"Bearer {token}"},
     )
     assert list_res.status_code == 200
-    assert len(list_res.json()) == 1
+    assert len(list_res.json()["items"]) == 1
+    # The raw listing path must produce exactly what the model-based single-report route does.
+    assert list_res.json()["items"][0] == fetched.json()
 
 
 @pytest.mark.asyncio
@@ -94,3 +112,405 @@ async def test_workload_analytics(client):
     assert workload_res.status_code == 200
     items = workload_res.json()["items"]
     assert items[0]["periods_taught"] == 4
+
+
+@pytest.mark.asyncio
+async def test_list_reports_pagination_and_fields(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Dan", "email": "dan@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post(
+            "/auth/login",
+            json={"email": "dan@example.com", "password": "password123"},
+        )
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    periods = [
+        {
+            "period_number": i,
+            "subject": "History",
+            "topic": f"Topic {i}",
+            "subject_teacher_id": user_id,
+            "signed": True,
+            "remarks": "",
+        }
+        for i in range(1, 9)
+    ]
+    for day, class_name in ((3, "Grade 8-C"), (1, "Grade 8-C"), (2, "Grade 8-C"), (2, "Grade 8-D"), (5, "Grade 8-C")):
+        await client.post(
+            "/reports",
+            json={
+                "date": f"2024-09-0{day}",
+                "class_name": class_name,
+                "class_teacher_id": user_id,
+                "periods": periods,
+            },
+            headers=headers,
+        )
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "fields": "date,class_name"}
+        if cursor:
+            params["cursor"] = cursor
+        page = (await client.get("/reports", params=params, headers=headers)).json()
+        for item in page["items"]:
+            assert set(item) == {"id", "date", "class_name"}
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [item["date"] for item in seen] == ["2024-09-01", "2024-09-02", "2024-09-02", "2024-09-03", "2024-09-05"]
+    assert len({item["id"] for item in seen}) == 5
+
+    bad = await client.get("/reports", params={"fields": "password"}, headers=headers)
+    assert bad.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_reports_streams_ndjson_and_csv(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Eve", "email": "eve@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post(
+            "/auth/login",
+            json={"email": "eve@example.com", "password": "password123"},
+        )
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    periods = [
+        {
+            "period_number": i,
+            "subject": "Art",
+            "topic": f"Topic {i}",
+            "subject_teacher_id": user_id,
+            "signed": i <= 5,
+            "remarks": "",
+        }
+        for i in range(1, 9)
+    ]
+    for day in (1, 2, 3):
+        await client.post(
+            "/reports",
+            json={
+                "date": f"2024-09-0{day}",
+                "class_name": "Grade 7-A",
+                "class_teacher_id": user_id,
+                "periods": periods,
+            },
+            headers=headers,
+        )
+
+    ndjson_res = await client.get("/reports/export", params={"batch_size": 2}, headers=headers)
+    assert ndjson_res.status_code == 200
+    assert ndjson_res.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson_res.text.splitlines()]
+    assert [r["date"] for r in rows] == ["2024-09-01", "2024-09-02", "2024-09-03"]
+    assert all(r["total_periods_taught"] == 5 for r in rows)
+
+    csv_res = await client.get(
+        "/reports/export",
+        params={"format": "csv", "rows": "period", "start_date": "2024-09-02", "batch_size": 3},
+        headers=headers,
+    )
+    assert csv_res.status_code == 200
+    period_rows = list(csv.DictReader(io.StringIO(csv_res.text)))
+    assert len(period_rows) == 16
+    assert sum(r["signed"] == "True" for r in period_rows) == 10
+
+
+@pytest.mark.asyncio
+async def test_bulk_submit_reports_reports_per_item_results(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Finn", "email": "finn@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post(
+            "/auth/login",
+            json={"email": "finn@example.com", "password": "password123"},
+        )
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def report(day, teacher_id, count=8):
+        return {
+            "date": f"2024-10-0{day}",
+            "class_name": "Grade 6-B",
+            "class_teacher_id": user_id,
+            "periods": [
+                {
+                    "period_number": i,
+                    "subject": "Music",
+                    "topic": f"Topic {i}",
+                    "subject_teacher_id": teacher_id,
+                    "signed": True,
+                }
+                for i in range(1, count + 1)
+            ],
+        }
+
+    payload = [
+        report(1, user_id),
+        report(2, user_id, count=7),
+        report(3, "64f6c5c2e13f1af4efc12345"),
+        report(4, user_id),
+    ]
+    res = await client.post("/reports/bulk", json=payload, headers=headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["inserted"] == 2
+    assert body["failed"] == 2
+    assert [item["ok"] for item in body["items"]] == [True, False, False, True]
+    assert body["items"][2]["error"] == "You can only sign periods you teach."
+
+    fetched = await client.get(f"/reports/{body['items'][3]['id']}", headers=headers)
+    assert fetched.status_code == 200
+    assert fetched.json()["date"] == "2024-10-04"
+
+
+@pytest.mark.asyncio
+async def test_analytics_etag_revalidation(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Ivy", "email": "ivy@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post(
+            "/auth/login",
+            json={"email": "ivy@example.com", "password": "password123"},
+        )
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def report(day):
+        return {
+            "date": f"2024-11-0{day}",
+            "class_name": "Grade 5-A",
+            "class_teacher_id": user_id,
+            "periods": [
+                {
+                    "period_number": i,
+                    "subject": "PE",
+                    "topic": f"Topic {i}",
+                    "subject_teacher_id": user_id,
+                    "signed": True,
+                }
+                for i in range(1, 9)
+            ],
+        }
+
+    await client.post("/reports", json=report(1), headers=headers)
+    first = await client.get("/analytics/workload", headers=headers)
+    etag = first.headers["etag"]
+    assert first.json()["items"][0]["periods_taught"] == 8
+
+    not_modified = await client.get("/analytics/workload", headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    await client.post("/reports", json=report(2), headers=headers)
+    changed = await client.get("/analytics/workload", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["items"][0]["periods_taught"] == 16
+
+
+@pytest.mark.asyncio
+async def test_report_submission_is_idempotent_per_class_and_date(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Kai", "email": "kai@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post(
+            "/auth/login",
+            json={"email": "kai@example.com", "password": "password123"},
+        )
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def report(topic):
+        return {
+            "date": "2024-12-02",
+            "class_name": "Grade 4-A",
+            "class_teacher_id": user_id,
+            "periods": [
+                {
+                    "period_number": i,
+                    "subject": "Math",
+                    "topic": topic,
+                    "subject_teacher_id": user_id,
+                    "signed": True,
+                }
+                for i in range(1, 9)
+            ],
+        }
+
+    first = await client.post("/reports", json=report("Fractions"), headers={**headers, "Idempotency-Key": "abc"})
+    assert first.status_code == 200
+    retry = await client.post("/reports", json=report("Fractions"), headers={**headers, "Idempotency-Key": "abc"})
+    assert retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+    plain_retry = await client.post("/reports", json=report("Fractions"), headers=headers)
+    assert plain_retry.json()["id"] == first.json()["id"]
+
+    conflict = await client.post("/reports", json=report("Decimals"), headers=headers)
+    assert conflict.status_code == 409
+    reused = await client.post("/reports", json=report("Decimals"), headers={**headers, "Idempotency-Key": "abc"})
+    assert reused.status_code == 422
+    other_day = {**report("Fractions"), "date": "2024-12-03"}
+    reused = await client.post("/reports", json=other_day, headers={**headers, "Idempotency-Key": "abc"})
+    assert reused.status_code == 422
+
+    bulk = await client.post("/reports/bulk", json=[report("Fractions")], headers=headers)
+    assert bulk.json()["items"][0]["error"] == "A report for Grade 4-A on 2024-12-02 already exists"
+
+    listed = await client.get("/reports", headers=headers)
+    assert len(listed.json()["items"]) == 1
+    workload = await client.get("/analytics/workload", headers=headers)
+    assert workload.json()["items"][0]["periods_taught"] == 8
+
+
+@pytest.mark.asyncio
+async def test_report_stream_pushes_new_submissions(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Lee", "email": "lee@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post("/auth/login", json={"email": "lee@example.com", "password": "password123"})
+    ).json()["access_token"]
+    assert (await client.get("/reports/stream")).status_code == 401
+
+    broker = get_report_broker()
+    everything = broker.subscribe()
+    other_class = broker.subscribe("Grade 1-A")
+    periods = [
+        {"period_number": i, "subject": "Art", "topic": "Clay", "subject_teacher_id": user_id, "signed": i <= 6}
+        for i in range(1, 9)
+    ]
+    res = await client.post(
+        "/reports",
+        json={"date": "2024-12-03", "class_name": "Grade 5-A", "class_teacher_id": user_id, "periods": periods},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    frame = everything.queue.get_nowait().decode()
+    assert frame.startswith(f"event: report\nid: {res.json()['id']}\n")
+    event = json.loads(frame.split("data: ", 1)[1])
+    assert event["report"]["missed"] == 2
+    assert event["report"]["signed_mask"] == 0b00111111
+    assert event["workload"] == {user_id: 6}
+    assert other_class.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_report_stream_endpoint_accepts_query_token(client):
+    signup_res = await client.post(
+        "/auth/signup",
+        json={"name": "Mo", "email": "mo@example.com", "password": "password123", "role": "teacher"},
+    )
+    user_id = signup_res.json()["id"]
+    token = (
+        await client.post("/auth/login", json={"email": "mo@example.com", "password": "password123"})
+    ).json()["access_token"]
+
+    # httpx's ASGITransport waits for the whole body, so the endless stream is driven over raw ASGI here.
+    messages = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if b"event: report" in message.get("body", b""):
+            disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/reports/stream",
+        "raw_path": b"/reports/stream",
+        "root_path": "",
+        "query_string": f"access_token={token}&class_name=Grade 6-A".encode(),
+        "headers": [(b"host", b"test")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    broker = get_report_broker()
+    stream = asyncio.create_task(client._transport.app(scope, receive, send))
+    while not broker.subscribers:
+        await asyncio.sleep(0.01)
+
+    periods = [
+        {"period_number": i, "subject": "Art", "topic": "Clay", "subject_teacher_id": user_id, "signed": True}
+        for i in range(1, 9)
+    ]
+    res = await client.post(
+        "/reports",
+        json={"date": "2024-12-04", "class_name": "Grade 6-A", "class_teacher_id": user_id, "periods": periods},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    await asyncio.wait_for(stream, timeout=5)
+
+    start = messages[0]
+    assert start["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+    assert any(name == b"server-timing" for name, _ in start["headers"])
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    assert body.startswith(RETRY_FRAME)
+    assert f"event: report\nid: {res.json()['id']}\n".encode() in body
+    assert broker.subscribers == set()
+
+
+def test_slow_stream_subscriber_is_told_to_resync():
+    subscription = Subscription(buffer_size=3)
+    for i in range(3):
+        assert subscription.offer(f"frame {i}".encode()) == 0
+    assert subscription.offer(b"frame 3") == 3
+    assert subscription.queue.get_nowait() == RESYNC_FRAME
+    assert subscription.queue.get_nowait() == b"frame 3"
+    assert subscription.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_frames_sends_keepalives_and_unsubscribes():
+    broker = ReportBroker(buffer_size=10, max_subscribers=1)
+    disconnected = iter([False, True])
+
+    async def is_disconnected():
+        return next(disconnected)
+
+    stream = stream_frames(broker, None, is_disconnected, keepalive=0.01)
+    assert broker.subscribers == set()
+    assert await stream.__anext__() == RETRY_FRAME
+    [subscription] = broker.subscribers
+    with pytest.raises(HTTPException):
+        broker.subscribe()
+    subscription.offer(b"event: report\n\n")
+    frames = [frame async for frame in stream]
+    assert frames == [b"event: report\n\n", KEEPALIVE_FRAME]
+    assert broker.subscribers == set()
+
+    # A stream closed before it starts never subscribes.
+    await stream_frames(broker, None, is_disconnected, keepalive=0.01).aclose()
+    assert broker.subscribers == set()
@@ -0,0 +1,97 @@
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+import app.main
+from app import server
+from app.config import Settings, get_settings
+from app.services.metrics import startup
+
+
+async def index_names(motor_client, settings):
+    return [index["name"] async for index in motor_client[settings.mongodb_db]["daily_reports"].list_indexes()]
+
+
+@pytest.mark.asyncio
+async def test_leader_builds_indexes_and_workers_skip_them():
+    settings = Settings(mongodb_db="teacher_ams_server_test", skip_index_creation=True)
+    worker_client = AsyncMongoMockClient()
+    worker = app.main.create_app(settings=settings, motor_client=worker_client)
+    async with worker.router.lifespan_context(worker):
+        assert "class_name_1_date_1" not in await index_names(worker_client, settings)
+    assert "init_beanie" in startup.phases
+
+    leader_client = AsyncMongoMockClient()
+    results = await server.prepare_database(settings, motor_client=leader_client)
+    assert results == {
+        "backfill_period_summaries": {"reports_updated": 0},
+        "backfill_period_assignments": {"period_assignments": 0},
+    }
+    assert "class_name_1_date_1" in await index_names(leader_client, settings)
+    assert {"indexes", "migrations"} <= set(startup.phases)
+
+
+@pytest.mark.asyncio
+async def test_worker_startup_leaves_backfills_to_the_leader():
+    settings = Settings(mongodb_db="teacher_ams_server_test", skip_index_creation=False)
+    motor_client = AsyncMongoMockClient()
+    teacher = ObjectId()
+    periods = [
+        {"period_number": i, "subject": "Art", "topic": "Clay", "subject_teacher_id": teacher, "signed": i < 3}
+        for i in range(1, 9)
+    ]
+    reports = motor_client[settings.mongodb_db]["daily_reports"]
+    await reports.insert_one(
+        {"date": datetime(2024, 9, 2), "class_name": "Grade 7-A", "class_teacher_id": teacher, "periods": periods}
+    )
+    worker = app.main.create_app(settings=settings, motor_client=motor_client)
+    async with worker.router.lifespan_context(worker):
+        assert "signed_mask" not in await reports.find_one({})
+        assert await motor_client[settings.mongodb_db]["period_assignments"].count_documents({}) == 0
+
+    await server.prepare_database(settings, motor_client)
+    report = await reports.find_one({})
+    assignments = await motor_client[settings.mongodb_db]["period_assignments"].count_documents({})
+    assert report["signed_mask"] == 0b11
+    assert report["teacher_slots"][0]["taught"] == 2
+    assert assignments == 8
+
+
+def test_server_main_runs_setup_once_then_starts_workers(monkeypatch):
+    calls = []
+
+    async def fake_prepare(settings, motor_client=None, migrate=True):
+        calls.append(("prepare", migrate))
+        return {}
+
+    def fake_run(target, **kwargs):
+        calls.append(("run", target, kwargs["workers"], get_settings().skip_index_creation))
+
+    monkeypatch.setenv("SKIP_INDEX_CREATION", "false")
+    monkeypatch.setattr(server, "prepare_database", fake_prepare)
+    monkeypatch.setattr("uvicorn.run", fake_run)
+    get_settings.cache_clear()
+    try:
+        server.main(["--workers", "4"])
+        server.main(["--workers", "2", "--no-migrate"])
+    finally:
+        get_settings.cache_clear()
+    assert calls == [
+        ("prepare", True),
+        ("run", "app.main:app", 4, True),
+        ("prepare", False),
+        ("run", "app.main:app", 2, True),
+    ]
+
+
+def test_importing_main_does_not_build_an_app():
+    check = (
+        "import app.main as m; assert 'app' not in vars(m); "
+        "assert m.app is m.app; assert 'numpy' not in __import__('sys').modules"
+    )
+    subprocess.run([sys.executable, "-c", check], check=True, cwd=Path(__file__).resolve().parents[1])
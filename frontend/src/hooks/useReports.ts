@@ -5,7 +5,7 @@ export async function createReport(payload: any) {
   return resp.data
 }
 
-export async function listReports() {
-  const resp = await api.get('/reports')
-  return resp.data
+export async function listReports(params: { cursor?: string; limit?: number; fields?: string } = {}) {
+  const resp = await api.get('/reports', { params })
+  return resp.data as { items: any[]; next_cursor: string | null }
 }